@@ -1,27 +1,173 @@
 import random
-import spacy
-from transformers import pipeline
+import analysis_cache
+import inference_batcher
+import metrics
+from model_registry import get_nlp, get_summarizer, registry
 
-nlp = spacy.load("en_core_web_sm")
-# Transformers summarizer
-summarizer = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6", framework="pt")
+# spaCy and the distilbart summarizer are loaded on first use by model_registry,
+# so importing this module (and app) stays cheap.
+
+TOPIC_LABELS = ("ORG", "PRODUCT", "PERSON")
+
+class PitchAnalysis:
+    """Journalist-independent NLP results for one pitch (topics, entities, summary)."""
+    def __init__(self, pitch_text, topics, entities, summary):
+        self.pitch_text = pitch_text
+        self.topics = topics
+        self.entities = entities
+        self.summary = summary
+
+    def to_dict(self):
+        return {
+            "topics": self.topics,
+            "entities": [list(e) for e in self.entities],
+            "summary": self.summary,
+        }
+
+    @classmethod
+    def from_dict(cls, pitch_text, data):
+        return cls(
+            pitch_text=pitch_text,
+            topics=list(data["topics"]),
+            entities=[tuple(e) for e in data["entities"]],
+            summary=data["summary"],
+        )
+
+def __getattr__(name):
+    # Backwards compatibility for code that used the old module-level models
+    if name == "nlp":
+        return get_nlp()
+    if name == "summarizer":
+        return get_summarizer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def extract_topics(pitch_text):
-    doc = nlp(pitch_text)
-    
+    doc = get_nlp()(pitch_text)
+
     print(doc.ents)
-    topics = [ent.text for ent in doc.ents if ent.label_ in ("ORG", "PRODUCT", "PERSON")]
+    topics = [ent.text for ent in doc.ents if ent.label_ in TOPIC_LABELS]
     print(topics)
 
     return topics if topics else ["your topic"]
 
-def persona_response(journalist, pitch_text, conversation_history=None):
-    topics = extract_topics(pitch_text)
+def summarize(pitch_text):
+    summarizer = get_summarizer()
     try:
-        summary = summarizer(pitch_text, max_length=32, min_length=10, do_sample=False)[0]['summary_text']
+        return summarizer(pitch_text, max_length=32, min_length=10, do_sample=False)[0]['summary_text']
     except Exception:
-        summary = pitch_text[:50] + "..."
+        metrics.ERRORS.inc("summarizer")
+        return pitch_text[:50] + "..."
+
+def analysis_record(analysis):
+    """The analysis as stored with the pitch in the database (storage.pitch_ids)."""
+    return dict(analysis.to_dict(), model=",".join(registry.model_ids(["nlp", "summarizer"])))
+
+def pitch_cache_key(pitch_text):
+    return analysis_cache.cache_key(pitch_text, registry.model_ids(["nlp", "summarizer"]))
+
+def analyze_pitch(pitch_text, use_cache=True):
+    """
+    Runs the expensive NLP work (spaCy entities + distilbart summary) once per pitch.
+    The result can be shared across every journalist the pitch is sent to, and is
+    cached by content hash so resubmitted pitches skip the models entirely.
+    """
+    key = None
+    if use_cache:
+        key = pitch_cache_key(pitch_text)
+        cached = analysis_cache.get_cache().get(key)
+        metrics.CACHE_LOOKUPS.inc("hit" if cached is not None else "miss")
+        if cached is not None:
+            return PitchAnalysis.from_dict(pitch_text, cached)
+
+    nlp_batcher = inference_batcher.get_batcher("nlp")
+    summary_batcher = inference_batcher.get_batcher("summarizer")
+    if nlp_batcher and summary_batcher:
+        # Both submitted up front so the pitch joins the next spaCy and distilbart batches together
+        doc_future = nlp_batcher.submit(pitch_text)
+        summary_future = summary_batcher.submit(pitch_text)
+        with metrics.stage("nlp"):
+            doc = doc_future.result()
+        with metrics.stage("summarizer"):
+            summary = summary_future.result()
+    else:
+        nlp = get_nlp()
+        get_summarizer()  # first-use model loading is reported as model load time, not stage time
+        with metrics.stage("nlp"):
+            doc = nlp(pitch_text)
+        with metrics.stage("summarizer"):
+            summary = summarize(pitch_text)
+
+    analysis = _build_analysis(pitch_text, doc, summary)
+    if use_cache:
+        analysis_cache.get_cache().put(key, analysis.to_dict())
+    return analysis
+
+def _build_analysis(pitch_text, doc, summary):
+    entities = [(ent.text, ent.label_) for ent in doc.ents]
+    topics = [text for text, label in entities if label in TOPIC_LABELS]
+    return PitchAnalysis(
+        pitch_text=pitch_text,
+        topics=topics if topics else ["your topic"],
+        entities=entities,
+        summary=summary,
+    )
+
+def analyze_pitches(pitch_texts, use_cache=True):
+    """
+    Batch form of analyze_pitch for offline runs: cache hits are returned as is, and the
+    misses go through one nlp.pipe pass and one batched summarizer call.
+    """
+    pitch_texts = list(pitch_texts)
+    results = [None] * len(pitch_texts)
+    keys = [pitch_cache_key(t) for t in pitch_texts] if use_cache else [None] * len(pitch_texts)
+    if use_cache:
+        cache = analysis_cache.get_cache()
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            metrics.CACHE_LOOKUPS.inc("hit" if cached is not None else "miss")
+            if cached is not None:
+                results[i] = PitchAnalysis.from_dict(pitch_texts[i], cached)
+
+    todo = [i for i, r in enumerate(results) if r is None]
+    if todo:
+        texts = [pitch_texts[i] for i in todo]
+        nlp = get_nlp()
+        get_summarizer()
+        with metrics.stage("nlp"):
+            docs = list(nlp.pipe(texts, batch_size=len(texts)))
+        with metrics.stage("summarizer"):
+            summaries = inference_batcher.summarize_batch(texts)
+        for i, doc, summary in zip(todo, docs, summaries):
+            results[i] = _build_analysis(pitch_texts[i], doc, summary)
+            if use_cache:
+                analysis_cache.get_cache().put(keys[i], results[i].to_dict())
+    return results
+
+def render_response(journalist, analysis, conversation_history=None):
+    """
+    Builds one journalist's reply from a precomputed PitchAnalysis. No model calls.
+    `conversation_history` is the rolling window of earlier turns, oldest first, as
+    [{'topics': [...], 'summary': str}, ...] (see conversations.context_window).
+    """
+    with metrics.stage("render"):
+        return _render_response(journalist, analysis, conversation_history)
+
+def earlier_topics(conversation_history):
+    """Distinct topics from earlier turns, most recent first."""
+    seen = []
+    for turn in reversed(conversation_history or []):
+        for topic in turn.get("topics", []):
+            if topic != "your topic" and topic not in seen:
+                seen.append(topic)
+    return seen
+
+def _render_response(journalist, analysis, conversation_history=None):
+    topics = analysis.topics
+    summary = analysis.summary
     interests = journalist.interests.split(',')
+    previous = earlier_topics(conversation_history)
+    if previous and topics == ["your topic"]:
+        topics = previous[:2]  # a follow-up without named entities is still about the earlier subject
 
     starter = "From what I userstand : " + summary + "<br />"
 
@@ -31,5 +177,13 @@ def persona_response(journalist, pitch_text, conversation_history=None):
         f"{starter} <br> Thank you for reaching out. Can you provide more background on your target audience for this launch?",
         f"{starter} <br> This sounds interesting, especially since I cover {', '.join(interests)}. What makes this newsworthy right now?"
     ]
-    # Use conversation history for future expansion
-    return random.choice(templates)
\ No newline at end of file
+    if previous:
+        templates.append(
+            f"{starter} <br> Thanks for following up on {' and '.join(previous[:2])}. What has changed since your last message?"
+        )
+    return random.choice(templates)
+
+def persona_response(journalist, pitch_text, conversation_history=None, analysis=None):
+    if analysis is None:
+        analysis = analyze_pitch(pitch_text)
+    return render_response(journalist, analysis, conversation_history)
@@ -0,0 +1,121 @@
+import glob
+import os
+
+import numpy as np
+
+from persona_model import Persona, CRITERION_RULES
+
+_registries = {}  # directory -> PersonaRegistry, so repeated loads only re-parse changed files
+
+def _registry(directory):
+    from persona_registry import PersonaRegistry
+
+    registry = _registries.get(directory)
+    if registry is None:
+        registry = _registries[directory] = PersonaRegistry(directory, factory=Persona.from_data)
+    return registry
+
+def pitch_features(pitch_details):
+    """One 0/1 entry per CRITERION_RULES test, evaluated once per pitch."""
+    return np.array([1.0 if test(pitch_details) else 0.0 for _, test in CRITERION_RULES])
+
+class PersonaBank:
+    """
+    Scores many pitches against many personas in one pass.
+
+    Every persona's criteria_breakdown is compiled into two matrices:
+      rule_mask (C x R): which CRITERION_RULES apply to each criterion, from its name
+      weights   (N x C): each persona's weight for each criterion (0 if not its own)
+    A batch of M pitches becomes a feature matrix F (M x R). Criterion c scores 5 when
+    F @ rule_mask.T > 0, exactly as score_criterion does, so the M x N weighted totals
+    are one matrix product. Strengths and weaknesses match Persona.assess_pitch exactly;
+    scores match up to floating-point summation order (~1e-13).
+    """
+    def __init__(self, personas):
+        self.personas = [p for p in personas if p.data]
+        criteria = []   # (persona index, name, definition)
+        for n, persona in enumerate(self.personas):
+            for name, definition in persona._views['criteria']:
+                criteria.append((n, name, definition))
+        self.criteria = criteria
+
+        self.rule_mask = np.zeros((len(criteria), len(CRITERION_RULES)))
+        self.weights = np.zeros((len(self.personas), len(criteria)))
+        for c, (n, name, definition) in enumerate(criteria):
+            lowered = name.lower()
+            for r, (substring, _) in enumerate(CRITERION_RULES):
+                if substring in lowered:
+                    self.rule_mask[c, r] = 1.0
+            self.weights[n, c] = definition.get('weight', 0.0)
+        self.max_scores = 5 * self.weights.sum(axis=1)
+
+    @classmethod
+    def from_paths(cls, paths):
+        """
+        Personas for the given JSON files, each parsed once per process through a
+        PersonaRegistry for its directory; invalid documents are reported and skipped.
+        """
+        personas = []
+        for path in paths:
+            directory, filename = os.path.split(os.path.abspath(path))
+            if not filename.endswith('.json'):
+                personas.append(Persona(path))
+                continue
+            try:
+                personas.append(_registry(directory).get(filename[:-5]))
+            except (KeyError, ValueError) as e:
+                print(f"Error: {e.args[0] if e.args else e}")
+        return cls(personas)
+
+    @classmethod
+    def from_directory(cls, directory, pattern="*.json"):
+        return cls.from_paths(sorted(glob.glob(os.path.join(directory, pattern))))
+
+    @classmethod
+    def from_registry(cls, registry):
+        """Uses the personas a persona_registry.PersonaRegistry built with factory=Persona.from_data."""
+        return cls(registry.personas())
+
+    @property
+    def names(self):
+        return [p.persona_name for p in self.personas]
+
+    def criterion_scores(self, pitches):
+        """M x C matrix of per-criterion scores (0 or 5)."""
+        features = np.stack([pitch_features(p) for p in pitches]) if pitches else np.zeros((0, len(CRITERION_RULES)))
+        return 5.0 * ((features @ self.rule_mask.T) > 0)
+
+    def score(self, pitches):
+        """M x N matrix of overall percentages, as returned in assess_pitch()['score']."""
+        totals = self.criterion_scores(pitches) @ self.weights.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.max_scores > 0, totals / self.max_scores * 100, 0.0)
+
+    def rank(self, pitches, top_k=None):
+        """For each pitch, [(persona_name, score)] best first."""
+        scores = self.score(pitches)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        if top_k is not None:
+            order = order[:, :top_k]
+        names = self.names
+        return [[(names[n], float(scores[m, n])) for n in row] for m, row in enumerate(order)]
+
+    def assessments(self, pitches):
+        """
+        Per-pitch, per-persona score/strengths/weaknesses matching assess_pitch()
+        (without the templated feedback message), computed from the batched matrices.
+        """
+        per_criterion = self.criterion_scores(pitches)
+        scores = self.score(pitches)
+        results = []
+        for m in range(len(pitches)):
+            row = [{"score": float(scores[m, n]), "strengths": [], "weaknesses": []}
+                   for n in range(len(self.personas))]
+            for c, (n, name, definition) in enumerate(self.criteria):
+                score = int(per_criterion[m, c])
+                if score >= 4:
+                    row[n]["strengths"].append(f"{name}: {definition['details']} (Score: {score}/5)")
+                elif score <= 2:
+                    row[n]["weaknesses"].append(f"{name}: {definition['details']} (Score: {score}/5)")
+            results.append(row)
+        return results
@@ -2,9 +2,56 @@ import json
 import random
 from textwrap import dedent
 
+def _flatten_paths(node, prefix, out):
+    """Records every dotted path reachable through nested dicts, e.g. 'a.b.c' -> value."""
+    for key, value in node.items():
+        if not isinstance(key, str) or '.' in key:
+            continue  # not addressable with a dotted path
+        path = f"{prefix}.{key}" if prefix else key
+        out[path] = value
+        if isinstance(value, dict):
+            _flatten_paths(value, path, out)
+    return out
+
+def _pluck(items, field):
+    """[item[field] for item in items], skipping entries that are not dicts with that field."""
+    if not isinstance(items, list):
+        return []
+    return [item[field] for item in items if isinstance(item, dict) and field in item]
+
+# Simplified scoring rules for demonstration: (substring of the criterion name, test on pitch_details).
+# A criterion scores 5 if any rule whose substring appears in its name passes, else 0.
+# In a real system, you'd use NLP to evaluate pitch_details against each criterion.
+CRITERION_RULES = [
+    ("relevance", lambda p: "relevance" in p.get("keywords", [])),
+    ("newsworthiness", lambda p: "breaking" in p.get("keywords", [])),
+    ("clarity", lambda p: len(p.get("summary", "")) < 200),  # Assume concise is good
+    ("completeness", lambda p: p.get("data_provided", False)),
+    ("originality", lambda p: "unique_angle" in p.get("keywords", [])),
+    ("impact", lambda p: p.get("potential_impact", 0) > 0.7),
+    ("credibility", lambda p: p.get("source_reputation", 0) > 0.8),
+    ("ethical", lambda p: p.get("ethical_alignment", True)),
+]
+
+def score_criterion(criterion_name, pitch_details):
+    name = criterion_name.lower()
+    score = 0
+    for substring, test in CRITERION_RULES:
+        if substring in name and test(pitch_details):
+            score += 5
+    return min(score, 5) # Cap score at 5 for simplicity
+
 class Persona:
+    # Fixed attribute set: no per-instance __dict__, cheaper attribute access.
+    __slots__ = ('_data', '_paths', '_views', 'persona_name', 'real_person_name')
+
     def __init__(self, persona_json_path):
         """Initializes the persona from a JSON file."""
+        self._data = {}
+        self._paths = {}
+        self._views = {}
+        self.persona_name = None
+        self.real_person_name = None
         try:
             with open(persona_json_path, 'r', encoding='utf-8') as f:
                 self.data = json.load(f)
@@ -18,16 +65,51 @@ class Persona:
             print(f"Error: Invalid JSON format in {persona_json_path}")
             self.data = {}
 
+    @classmethod
+    def from_data(cls, data):
+        """
+        Builds a persona from an already parsed document without touching the file system,
+        e.g. as the factory of a persona_registry.PersonaRegistry. The document is not copied.
+        """
+        persona = cls.__new__(cls)
+        persona.data = data
+        persona.persona_name = data['persona_identification']['persona_name']
+        persona.real_person_name = data['persona_identification']['real_person_reference']['real_person_full_name']
+        return persona
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Rebuilds the path index and derived views. Assigning `data` does this automatically;
+        call it directly after mutating the nested persona data in place.
+        """
+        self._paths = _flatten_paths(self._data, '', {}) if isinstance(self._data, dict) else {}
+        get = self._get_attribute
+        criteria = get('interaction_protocols.pitch_assessment_criteria.criteria_breakdown', {})
+        self._views = {
+            'primary_tones': get('communication_linguistic_style.overall_tone.primary_tone', ['Analytical']),
+            'vocab_descriptors': _pluck(get('communication_linguistic_style.vocabulary_usage.descriptors', []), 'usage'),
+            'common_phrases': _pluck(get('core_attributes.common_phrases_keywords', []), 'phrase'),
+            'principles': _pluck(get('core_attributes.core_principles_and_values', []), 'name'),
+            'thematic_focus': _pluck(get('cognitive_information_processing.key_thematic_focus_areas', []), 'theme'),
+            'criteria': list(criteria.items()) if isinstance(criteria, dict) else [],
+            'response_goal': get('interaction_protocols.response_framing_principles.goal_of_response', 'provide feedback.'),
+            'response_tone_options': get('interaction_protocols.response_framing_principles.tone_for_response', 'professional'),
+            'question_purposes': _pluck(get('communication_linguistic_style.questioning_technique.typical_question_types', []), 'purpose'),
+            'priority_question_focus': _pluck(get('interaction_protocols.reaction_to_press_conference_protocol.priority_questions', []), 'focus'),
+        }
+
     def _get_attribute(self, path, default=None):
-        """Helper to safely get nested attributes from the persona data."""
-        keys = path.split('.')
-        current = self.data
-        try:
-            for key in keys:
-                current = current[key]
-            return current
-        except (KeyError, TypeError):
-            return default
+        """Helper to safely get nested attributes from the persona data (O(1) via the path index)."""
+        return self._paths.get(path, default)
 
     def _apply_dynamic_weights(self, attribute_value, context=None):
         """
@@ -60,39 +142,15 @@ class Persona:
         if not self.data:
             return {"error": "Persona not loaded."}
 
-        criteria = self._get_attribute('interaction_protocols.pitch_assessment_criteria.criteria_breakdown', {})
+        criteria = self._views['criteria']
         total_weighted_score = 0
         max_possible_score = 0
         strengths = []
         weaknesses = []
 
-        # Simplified scoring logic for demonstration.
-        # In a real system, you'd use NLP to evaluate pitch_details against criterion.
-        def score_criterion(criterion_name, criterion_def, pitch_details):
-            score = 0
-            # Placeholder: Replace with actual logic based on pitch_details content
-            if "relevance" in criterion_name.lower() and "relevance" in pitch_details.get("keywords", []):
-                score += 5
-            if "newsworthiness" in criterion_name.lower() and "breaking" in pitch_details.get("keywords", []):
-                score += 5
-            if "clarity" in criterion_name.lower() and len(pitch_details.get("summary", "")) < 200:
-                score += 5 # Assume concise is good
-            if "completeness" in criterion_name.lower() and pitch_details.get("data_provided", False):
-                score += 5
-            if "originality" in criterion_name.lower() and "unique_angle" in pitch_details.get("keywords", []):
-                score += 5
-            if "impact" in criterion_name.lower() and pitch_details.get("potential_impact", 0) > 0.7:
-                score += 5
-            if "credibility" in criterion_name.lower() and pitch_details.get("source_reputation", 0) > 0.8:
-                score += 5
-            if "ethical" in criterion_name.lower() and pitch_details.get("ethical_alignment", True):
-                score += 5
-            
-            return min(score, 5) # Cap score at 5 for simplicity
-
-        for crit_name, crit_def in criteria.items():
+        for crit_name, crit_def in criteria:
             weight = crit_def.get('weight', 0.0)
-            score = score_criterion(crit_name, crit_def, pitch_details)
+            score = score_criterion(crit_name, pitch_details)
             weighted_score = score * weight
             total_weighted_score += weighted_score
             max_possible_score += 5 * weight # Assuming max score for a criterion is 5
@@ -105,8 +163,8 @@ class Persona:
         overall_percentage = (total_weighted_score / max_possible_score) * 100 if max_possible_score > 0 else 0
 
         # Constructing the response based on persona's response framing principles
-        response_goal = self._get_attribute('interaction_protocols.response_framing_principles.goal_of_response', 'provide feedback.')
-        response_tone_options = self._get_attribute('interaction_protocols.response_framing_principles.tone_for_response', 'professional')
+        response_goal = self._views['response_goal']
+        response_tone_options = self._views['response_tone_options']
         
         # Pick a tone from options (simplified)
         response_tone = response_tone_options[0] if isinstance(response_tone_options, list) else response_tone_options
@@ -161,20 +219,15 @@ class Persona:
             return {"error": "Persona not loaded."}
 
         # Dynamically select communication style elements based on context
-        tone_options = self._get_attribute('communication_linguistic_style.overall_tone.primary_tone', ['Analytical'])
+        views = self._views
+        tone_options = views['primary_tones']
         selected_tone = random.choice(tone_options) if isinstance(tone_options, list) else tone_options
 
-        # Vocabulary usage - pick some descriptors
-        vocab_descriptors = [d['usage'] for d in self._get_attribute('communication_linguistic_style.vocabulary_usage.descriptors', []) if 'usage' in d]
-        
-        # Common phrases
-        common_phrases = [p['phrase'] for p in self._get_attribute('core_attributes.common_phrases_keywords', [])]
-        
-        # Core principles for content framing
-        principles = [p['name'] for p in self._get_attribute('core_attributes.core_principles_and_values', [])]
-        
-        # Key thematic focus for content relevance
-        thematic_focus = [t['theme'] for t in self._get_attribute('cognitive_information_processing.key_thematic_focus_areas', [])]
+        # Vocabulary descriptors, common phrases, core principles and thematic focus
+        # are precomputed in invalidate()
+        common_phrases = views['common_phrases']
+        principles = views['principles']
+        thematic_focus = views['thematic_focus']
 
         # Construct a response based on simplified rules
         response_parts = []
@@ -215,15 +268,11 @@ class Persona:
         if not self.data:
             return {"error": "Persona not loaded."}
         
-        question_types = self._get_attribute('communication_linguistic_style.questioning_technique.typical_question_types', [])
-        priority_questions_config = self._get_attribute('interaction_protocols.reaction_to_press_conference_protocol.priority_questions', [])
-
         # Filter questions based on context if possible, or pick a random one
-        relevant_questions = []
         if context == "press conference":
-            relevant_questions = [q['focus'] for q in priority_questions_config]
+            relevant_questions = self._views['priority_question_focus']
         else:
-            relevant_questions = [q['purpose'] for q in question_types]
+            relevant_questions = self._views['question_purposes']
 
         if not relevant_questions:
             return {"question": f"Given the topic of '{topic}', what more can you tell me?", "type": "General Inquiry"}
@@ -231,7 +280,7 @@ class Persona:
         selected_question_focus = random.choice(relevant_questions)
         
         # Craft a question using common phrases and style elements
-        question_starter = random.choice(self._get_attribute('core_attributes.common_phrases_keywords', []))['phrase']
+        question_starter = random.choice(self._views['common_phrases'])
         
         question_text = f"{question_starter} Regarding '{topic}', {selected_question_focus.replace('e.g., ', '')}"
 
@@ -1,12 +1,231 @@
+import argparse
+import hashlib
 import json
+import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
-def calculate_attribute_weights(observation_data_path, output_json_path, persona_template_path):
+PRINT_LIMIT = 50  # print every average only for small runs
+CHECKPOINT_EVERY = 100000  # observations between shard checkpoints
+
+def observation_scores(obs):
+    """
+    Yields (attribute_path, normalized score) for one observation. Nested score dicts
+    like {"...primary_tone": {"Empathetic": 5}} are treated as "...primary_tone.Empathetic": 5.
+    """
+    max_score = obs.get("max_score_per_attribute", 5) # Default max score for the observation
+    stack = list(obs.get("attribute_scores", {}).items())
+    while stack:
+        attr_path, score = stack.pop()
+        if isinstance(score, dict):
+            stack.extend((f"{attr_path}.{k}", v) for k, v in score.items())
+        else:
+            # Convert raw score to a normalized value (0 to 1) for averaging
+            yield attr_path, score / max_score
+
+class WeightAccumulator:
+    """Running per-attribute sums and counts; partial results from shards merge by addition."""
+    def __init__(self, sums=None, counts=None, observations=0, bad_lines=0):
+        self.sums = defaultdict(float, sums or {})
+        self.counts = defaultdict(int, counts or {})
+        self.observations = observations
+        self.bad_lines = bad_lines
+
+    def add(self, obs):
+        for attr_path, normalized_score in observation_scores(obs):
+            self.sums[attr_path] += normalized_score
+            self.counts[attr_path] += 1
+        self.observations += 1
+
+    def merge(self, other):
+        for path, value in other.sums.items():
+            self.sums[path] += value
+        for path, value in other.counts.items():
+            self.counts[path] += value
+        self.observations += other.observations
+        self.bad_lines += other.bad_lines
+        return self
+
+    def averages(self):
+        return {path: self.sums[path] / self.counts[path] for path in sorted(self.sums)}
+
+    def to_dict(self):
+        return {"sums": self.sums, "counts": self.counts,
+                "observations": self.observations, "bad_lines": self.bad_lines}
+
+def _is_jsonl(path):
+    if path.endswith(('.jsonl', '.ndjson')):
+        return True
+    with open(path, 'rb') as f:
+        head = f.read(64).lstrip()
+    return not head.startswith(b'[')
+
+def _shard_bounds(path, shards):
+    size = os.path.getsize(path)
+    step = max(1, size // shards)
+    bounds = [(i * step, (i + 1) * step) for i in range(shards)]
+    bounds[-1] = (bounds[-1][0], size)
+    return [b for b in bounds if b[0] < b[1]] or [(0, size)]
+
+def _write_checkpoint(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+def _reduce_shard(path, start, end, checkpoint_path=None, checkpoint_every=CHECKPOINT_EVERY):
+    """
+    Reduces the lines whose first byte lies in [start, end). A line straddling `start`
+    belongs to the previous shard. Progress is checkpointed every `checkpoint_every` lines.
+    """
+    acc = WeightAccumulator()
+    position = start
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding='utf-8') as f:
+            state = json.load(f)
+        acc = WeightAccumulator(state["sums"], state["counts"], state["observations"], state["bad_lines"])
+        if state["done"]:
+            return acc.to_dict()
+        position = state["position"]
+
+    with open(path, 'rb') as f:
+        if position > 0 and position == start:
+            f.seek(position - 1)
+            f.readline()  # skip to the first line that starts inside this shard
+        else:
+            f.seek(position)
+        since_checkpoint = 0
+        while True:
+            position = f.tell()
+            if position >= end:
+                break
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                try:
+                    acc.add(json.loads(line))
+                except (ValueError, TypeError, AttributeError, ZeroDivisionError):
+                    acc.bad_lines += 1
+            since_checkpoint += 1
+            if checkpoint_path and since_checkpoint >= checkpoint_every:
+                _write_checkpoint(checkpoint_path, dict(acc.to_dict(), position=f.tell(), done=False))
+                since_checkpoint = 0
+        position = f.tell()
+
+    if checkpoint_path:
+        _write_checkpoint(checkpoint_path, dict(acc.to_dict(), position=position, done=True))
+    return acc.to_dict()
+
+def _checkpoint_paths(path, shards, checkpoint_dir):
+    """Per-shard checkpoint files, discarded if they were written for a different input or sharding."""
+    if not checkpoint_dir:
+        return [None] * shards
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    st = os.stat(path)
+    fingerprint = hashlib.sha256(
+        f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|{shards}".encode('utf-8')
+    ).hexdigest()[:16]
+    manifest_path = os.path.join(checkpoint_dir, 'manifest.json')
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            stale = json.load(f).get('fingerprint') != fingerprint
+    except (FileNotFoundError, ValueError):
+        stale = True
+    paths = [os.path.join(checkpoint_dir, f'shard-{i}.json') for i in range(shards)]
+    if stale:
+        for name in os.listdir(checkpoint_dir):
+            if name.startswith('shard-'):
+                os.remove(os.path.join(checkpoint_dir, name))
+        _write_checkpoint(manifest_path, {'fingerprint': fingerprint, 'input': os.path.abspath(path)})
+    return paths
+
+def compute_average_weights(observation_data_path, workers=1, checkpoint_dir=None,
+                            checkpoint_every=CHECKPOINT_EVERY):
+    """
+    Average normalized score per attribute path. JSONL input is streamed line by line,
+    so memory is bounded by the number of distinct attributes, not observations; with
+    workers > 1 the file is split into byte-range shards reduced in a process pool.
+    """
+    if not _is_jsonl(observation_data_path):
+        # Legacy JSON array input has to be parsed whole
+        acc = WeightAccumulator()
+        with open(observation_data_path, 'r', encoding='utf-8') as f:
+            for obs in json.load(f):
+                acc.add(obs)
+        return acc.averages()
+
+    bounds = _shard_bounds(observation_data_path, max(1, workers))
+    checkpoints = _checkpoint_paths(observation_data_path, len(bounds), checkpoint_dir)
+    total = WeightAccumulator()
+    if len(bounds) == 1:
+        partials = [_reduce_shard(observation_data_path, *bounds[0], checkpoints[0], checkpoint_every)]
+    else:
+        with ProcessPoolExecutor(max_workers=len(bounds)) as pool:
+            partials = list(pool.map(_reduce_shard, [observation_data_path] * len(bounds),
+                                     [b[0] for b in bounds], [b[1] for b in bounds],
+                                     checkpoints, [checkpoint_every] * len(bounds)))
+    for partial in partials:
+        total.merge(WeightAccumulator(partial["sums"], partial["counts"],
+                                      partial["observations"], partial["bad_lines"]))
+    if total.bad_lines:
+        print(f"Warning: skipped {total.bad_lines} malformed observation lines.")
+    return total.averages()
+
+def build_path_index(persona_data):
+    """
+    One pass over the persona document mapping every dotted path that names a dict node
+    to that node. Entries of lists of dicts are addressed by their "name", so
+    "core_attributes.core_principles_and_values.Fearless Pursuit of Truth" maps to the
+    dict for that principle (the first one, if names repeat).
+    """
+    index = {'': persona_data} if isinstance(persona_data, dict) else {}
+    stack = [('', persona_data)]
+    while stack:
+        path, node = stack.pop()
+        if isinstance(node, dict):
+            children = node.items()
+        elif isinstance(node, list):
+            children = [(item["name"], item) for item in node
+                        if isinstance(item, dict) and isinstance(item.get("name"), str)]
+        else:
+            continue
+        for key, child in children:
+            if not isinstance(child, (dict, list)):
+                continue
+            child_path = f"{path}.{key}" if path else str(key)
+            if isinstance(child, dict):
+                index.setdefault(child_path, child)
+            stack.append((child_path, child))
+    return index
+
+def apply_weights(persona_data, weights, index=None):
+    """
+    Sets each "<parent path>.<key>" in `weights` to its value with one index lookup
+    per path; a missing final key is created, as a direct dict assignment would.
+    Returns {"updated": count, "unresolved": {path: reason}}.
+    """
+    if index is None:
+        index = build_path_index(persona_data)
+    report = {"updated": 0, "unresolved": {}}
+    for path, new_weight in weights.items():
+        parent_path, _, key = path.rpartition('.')
+        parent = index.get(parent_path)
+        if parent is None:
+            report["unresolved"][path] = f"no dict or named list entry at '{parent_path}'"
+            continue
+        parent[key] = new_weight
+        report["updated"] += 1
+    return report
+
+def calculate_attribute_weights(observation_data_path, output_json_path, persona_template_path,
+                                workers=1, checkpoint_dir=None):
     """
     Simulates calculating/refining attribute weights based on a set of observations.
     
     Args:
-        observation_data_path (str): Path to a JSON file containing simulated observations.
+        observation_data_path (str): Path to a JSON array or a JSONL file (one observation per line)
+                                     of simulated observations; JSONL is streamed and can be sharded.
                                      Each observation should manually score attributes.
                                      Example structure:
                                      [
@@ -32,12 +251,15 @@ def calculate_attribute_weights(observation_data_path, output_json_path, persona
                                      ]
         output_json_path (str): Path where the updated persona JSON with new weights will be saved.
         persona_template_path (str): Path to the original persona JSON template to update.
+        workers (int): Number of processes to shard a JSONL observation file across.
+        checkpoint_dir (str): If set, partial sums are checkpointed here and an interrupted
+                              run resumes from them.
     """
     try:
-        with open(observation_data_path, 'r', encoding='utf-8') as f:
-            observations = json.load(f)
         with open(persona_template_path, 'r', encoding='utf-8') as f:
             persona_data = json.load(f)
+        average_weights = compute_average_weights(observation_data_path, workers=workers,
+                                                  checkpoint_dir=checkpoint_dir)
     except FileNotFoundError:
         print(f"Error: Required file not found. Check paths.")
         return
@@ -45,91 +267,34 @@ def calculate_attribute_weights(observation_data_path, output_json_path, persona
         print(f"Error: Invalid JSON format in input files.")
         return
 
-    attribute_sums = defaultdict(float)
-    attribute_counts = defaultdict(int)
-
-    for obs in observations:
-        scores = obs.get("attribute_scores", {})
-        max_score = obs.get("max_score_per_attribute", 5) # Default max score for the observation
-
-        for attr_path, score in scores.items():
-            # Convert raw score to a normalized value (0 to 1) for averaging
-            normalized_score = score / max_score
-            attribute_sums[attr_path] += normalized_score
-            attribute_counts[attr_path] += 1
-    
-    # Calculate average normalized score for each attribute
-    average_weights = {
-        path: attribute_sums[path] / attribute_counts[path]
-        for path in attribute_sums
-    }
-
-    print("\nCalculated Average Weights:")
-    for path, avg_weight in average_weights.items():
-        print(f"  {path}: {avg_weight:.3f}")
+    if len(average_weights) <= PRINT_LIMIT:
+        print("\nCalculated Average Weights:")
+        for path, avg_weight in average_weights.items():
+            print(f"  {path}: {avg_weight:.3f}")
+    else:
+        print(f"\nCalculated average weights for {len(average_weights)} attributes.")
 
     # Apply calculated weights back to the persona_data structure
-    updated_attributes_count = 0
-    for path, new_weight in average_weights.items():
-        keys = path.split('.')
-        current_level = persona_data
-        
-        try:
-            for i, key in enumerate(keys):
-                if i == len(keys) - 1: # Last key is the attribute name
-                    if key.endswith(".weight"): # Directly update 'weight'
-                        parent_key = keys[-2]
-                        # Find the dictionary within the list that matches the parent key
-                        # This handles lists of dictionaries, like core_principles_and_values
-                        found = False
-                        if isinstance(current_level, list):
-                            for item in current_level:
-                                if isinstance(item, dict) and item.get("name") == parent_key:
-                                    item["weight"] = new_weight
-                                    found = True
-                                    updated_attributes_count += 1
-                                    break
-                            if not found: # If not found by 'name', try by raw key (e.g., if it's not a list of named dicts)
-                                if parent_key in current_level: # Direct dict key
-                                    current_level[parent_key] = new_weight
-                                    updated_attributes_count += 1
-                        elif isinstance(current_level, dict): # Direct dict key update
-                            current_level[key] = new_weight
-                            updated_attributes_count += 1
-                        break
-                    else: # If not updating 'weight', find the item in a list or dict
-                        if isinstance(current_level, list):
-                            # This path logic is more complex for nested lists of dicts
-                            # For simplicity, this example assumes direct 'weight' property or direct key update
-                            # Realistically, you'd need more sophisticated pathing logic for complex structures.
-                            pass # Handle other cases if needed
-                        else: # Direct dict key (e.g., if path is 'interaction_protocols.interaction_impact_weight')
-                            current_level[key] = new_weight
-                            updated_attributes_count += 1
-                else:
-                    if isinstance(current_level, list):
-                        # This part requires a specific strategy for lists of dicts.
-                        # For Barkha Dutt's JSON, a path like "core_attributes.core_principles_and_values.Fearless Pursuit of Truth.weight"
-                        # means: access core_attributes, then core_principles_and_values (which is a list).
-                        # Then find the dict in that list where "name" is "Fearless Pursuit of Truth".
-                        found_next_level = False
-                        for item in current_level:
-                            if isinstance(item, dict) and item.get("name") == key:
-                                current_level = item
-                                found_next_level = True
-                                break
-                        if not found_next_level:
-                            raise KeyError(f"Could not find item with name '{key}' in list.")
-                    else:
-                        current_level = current_level[key]
-
-        except (KeyError, TypeError) as e:
-            print(f"Warning: Could not update attribute path '{path}': {e}. Skipping.")
-            continue
-    
-    print(f"\nSuccessfully updated {updated_attributes_count} attribute weights in the persona data.")
+    report = apply_weights(persona_data, average_weights)
+    print(f"\nSuccessfully updated {report['updated']} attribute weights in the persona data.")
+    if report['unresolved']:
+        print(f"Warning: {len(report['unresolved'])} attribute paths could not be resolved:")
+        for path, reason in list(report['unresolved'].items())[:PRINT_LIMIT]:
+            print(f"  {path}: {reason}")
 
     # Save the updated persona data
     with open(output_json_path, 'w', encoding='utf-8') as f:
         json.dump(persona_data, f, indent=2, ensure_ascii=False)
-    print(f"Updated persona saved to {output_json_path}")
\ No newline at end of file
+    print(f"Updated persona saved to {output_json_path}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalculate persona attribute weights from observations.")
+    parser.add_argument("observations", help="JSON array or JSONL observation file")
+    parser.add_argument("persona", help="persona JSON template to update")
+    parser.add_argument("output", help="where to write the updated persona JSON")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--checkpoint-dir", default=None)
+    args = parser.parse_args()
+    calculate_attribute_weights(args.observations, args.output, args.persona,
+                                workers=args.workers, checkpoint_dir=args.checkpoint_dir)
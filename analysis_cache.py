@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import metrics
+
+def normalize_pitch(pitch_text):
+    """Unicode-normalizes and collapses whitespace so trivially re-pasted pitches share a key."""
+    return " ".join(unicodedata.normalize("NFC", pitch_text or "").split())
+
+def cache_key(pitch_text, model_ids):
+    """Content address: sha256 over the normalized pitch text plus the model identifiers."""
+    h = hashlib.sha256()
+    for model_id in model_ids:
+        h.update(model_id.encode("utf-8"))
+        h.update(b"\0")
+    h.update(normalize_pitch(pitch_text).encode("utf-8"))
+    return h.hexdigest()
+
+class AnalysisCache:
+    """
+    Two-tier cache for pitch NLP results.
+
+    Tier 1 is a bounded in-process LRU. Tier 2 is an optional SQLite file that survives
+    restarts and is shared by every worker on the host. Both tiers expire entries after
+    `ttl` seconds; the SQLite tier is trimmed to `max_rows` least recently used rows.
+    Values are plain JSON-serializable dicts.
+
+    The SQLite tier is best effort: it waits at most `disk_timeout` seconds for another
+    worker's write lock, and any SQLite error counts as a miss on get() and skips the
+    disk write on put() (counted in persona_errors_total), so the cache never fails a request.
+    """
+    def __init__(self, max_entries=1024, ttl=24 * 3600, db_path=None, max_rows=100000, disk_timeout=0.1):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.db_path = db_path
+        self.disk_timeout = disk_timeout
+        self._lru = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes_since_trim = 0
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._connect()
+
+    def _connect(self):
+        if not self.db_path:
+            return
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=self.disk_timeout,
+                                   check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pitch_analysis_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_pitch_analysis_cache_accessed_at"
+                " ON pitch_analysis_cache (accessed_at)"
+            )
+        except sqlite3.Error:
+            # Memory-only for this process rather than failing start-up over a cache
+            metrics.ERRORS.inc("analysis_cache")
+            if conn is not None:
+                conn.close()
+            return
+        self._conn = conn
+
+    def _reset_after_fork(self):
+        # A SQLite connection must not be used from two processes; open a fresh one
+        self._lock = threading.Lock()
+        self._conn = None
+        self._connect()
+
+    def _expired(self, stored_at, now):
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._lru.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return entry[1]
+                del self._lru[key]
+                self.stats["evictions"] += 1
+
+            if self._conn is not None:
+                try:
+                    row = self._get_disk(key, now)
+                except sqlite3.Error:
+                    metrics.ERRORS.inc("analysis_cache")
+                    row = None
+                if row is not None:
+                    value, stored_at = row
+                    self._put_memory(key, value, stored_at)
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return value
+
+            self.stats["misses"] += 1
+            return None
+
+    def _get_disk(self, key, now):
+        """(value, created_at) from the SQLite tier, or None when missing or expired."""
+        row = self._conn.execute(
+            "SELECT value, created_at FROM pitch_analysis_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if self._expired(row[1], now):
+            self._conn.execute("DELETE FROM pitch_analysis_cache WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            return None
+        try:
+            self._conn.execute("UPDATE pitch_analysis_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            # The row was read fine; only its LRU position goes stale while another worker writes
+            metrics.ERRORS.inc("analysis_cache")
+        return json.loads(row[0]), row[1]
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, value, now)
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO pitch_analysis_cache (key, value, created_at, accessed_at)"
+                        " VALUES (?, ?, ?, ?)",
+                        (key, json.dumps(value), now, now),
+                    )
+                    self._writes_since_trim += 1
+                    if self._writes_since_trim >= 100:
+                        self._trim_disk(now)
+                except sqlite3.Error:
+                    # Kept in memory only; another worker holding the write lock must not fail the request
+                    metrics.ERRORS.inc("analysis_cache")
+
+    def _put_memory(self, key, value, stored_at):
+        self._lru[key] = (stored_at, value)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _trim_disk(self, now):
+        self._writes_since_trim = 0
+        if self.ttl is not None:
+            cur = self._conn.execute(
+                "DELETE FROM pitch_analysis_cache WHERE created_at < ?", (now - self.ttl,)
+            )
+            self.stats["evictions"] += max(cur.rowcount, 0)
+        cur = self._conn.execute(
+            "DELETE FROM pitch_analysis_cache WHERE key IN ("
+            " SELECT key FROM pitch_analysis_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        )
+        self.stats["evictions"] += max(cur.rowcount, 0)
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM pitch_analysis_cache")
+
+    def snapshot(self):
+        """Counters plus current sizes, for logging or a metrics endpoint."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._lru)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+            return stats
+
+# Module-level cache used by ai_persona.analyze_pitch. Memory-only until configure()
+# is called with a db_path (app.py does this so the persistent tier sits next to
+# pr_platform.db).
+cache = AnalysisCache()
+
+def configure(**kwargs):
+    global cache
+    cache = AnalysisCache(**kwargs)
+    return cache
+
+def get_cache():
+    return cache
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: cache._reset_after_fork())
@@ -1,73 +1,313 @@
-from flask import Flask, render_template, request, jsonify
-from sqlalchemy import create_engine
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker, scoped_session
-from models import Base, Journalist, Interaction
-from ai_persona import persona_response
-import os, sys
+from models import Conversation, Journalist
+from ai_persona import analyze_pitch, analysis_record, render_response
+import analysis_cache
+import conversations
+import history
+import job_queue
+import journalist_index
+import storage
+import metrics
+from model_registry import registry
+from page_cache import PageCache
+from persona_registry import PersonaRegistry
+import os, json, time
+from datetime import datetime
 
 app = Flask(__name__)
 
-engine = create_engine('sqlite:///pr_platform.db', future=True, echo=False)
-Base.metadata.create_all(engine)
+engine = storage.make_engine()
+storage.migrate(engine)
 Session = scoped_session(sessionmaker(engine, future=True))
+# Interaction rows are buffered and bulk-inserted; PERSONA_WRITE_DELAY_MS=0 writes each row immediately
+interaction_writer = storage.InteractionWriter(
+    engine, max_delay=float(os.environ.get('PERSONA_WRITE_DELAY_MS', 200)) / 1000)
+
+# Persistent tier of the pitch analysis cache lives next to pr_platform.db;
+# PERSONA_CACHE_DB="" keeps the cache in memory only.
+analysis_cache.configure(db_path=os.environ.get('PERSONA_CACHE_DB', 'pitch_cache.db') or None)
+
+# Persona documents for /persona, parsed once and kept in memory; the compiled snapshot
+# (PERSONA_PERSONA_SNAPSHOT, "" to disable) saves re-parsing them on the next start.
+persona_documents = PersonaRegistry(os.path.join(app.root_path, 'doc/persona'),
+                                    snapshot_path=os.environ.get('PERSONA_PERSONA_SNAPSHOT', 'persona_snapshot.bin') or None)
+
+# Rendered /arch, /plan and /persona pages, gzipped once and re-rendered when their source files
+# or templates change; PERSONA_DOC_MAX_AGE sets Cache-Control max-age (default 0: always revalidate).
+doc_pages = PageCache(max_age=int(os.environ.get('PERSONA_DOC_MAX_AGE', 0)))
+TEMPLATE_DIR = os.path.join(app.root_path, 'templates')
+
+# Per-request stage breakdown in a Server-Timing header: always with PERSONA_TIMING_HEADER=1,
+# otherwise only when the client sends "X-Request-Timing: 1".
+TIMING_HEADER = os.environ.get('PERSONA_TIMING_HEADER') == '1'
+CACHE_STATS = metrics.gauge("persona_analysis_cache", "Pitch analysis cache state.", ["stat"])
+PENDING_WRITES = metrics.gauge("persona_interaction_writes_pending", "Buffered Interaction rows not yet flushed.")
+
+@metrics.add_collector
+def collect_component_stats():
+    for model, seconds in registry.load_seconds.items():
+        metrics.MODEL_LOAD_SECONDS.set(model, value=seconds)
+    for stat, value in analysis_cache.get_cache().snapshot().items():
+        CACHE_STATS.set(stat, value=value)
+    PENDING_WRITES.set(value=interaction_writer.pending())
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    elapsed = time.perf_counter() - g.request_started
+    metrics.REQUEST_SECONDS.observe(endpoint, request.method, value=elapsed)
+    metrics.REQUESTS.inc(endpoint, request.method, response.status_code)
+    if TIMING_HEADER or request.headers.get('X-Request-Timing') == '1':
+        timings = dict(metrics._request_timings() or {}, total=elapsed)
+        response.headers['Server-Timing'] = metrics.server_timing_header(timings)
+    return response
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    return jsonify({'status': 'ok'})
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """Ready once the models are loaded in this worker and the database answers."""
+    checks = {'models': registry.status()}
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        checks['database'] = True
+    except Exception as e:
+        checks['database'] = False
+        checks['database_error'] = str(e)
+    ready = checks['database'] and all(checks['models'].values())
+    return jsonify({'ready': ready, 'checks': checks}), 200 if ready else 503
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Journalists listed per page of the form on "/"
+INDEX_PAGE_SIZE = int(os.environ.get('PERSONA_INDEX_PAGE_SIZE', 200))
 
 @app.route("/", methods=["GET"])
 def index():
     with Session() as session:
-        journalists = session.query(Journalist).all()
-        print(journalists, file=sys.stdout)
-        return render_template("index.html", journalists=journalists)
+        journalists, next_after = history.journalist_page(
+            session, after=request.args.get('after', type=int), limit=INDEX_PAGE_SIZE)
+        with metrics.stage("template"):
+            return render_template("index.html", journalists=journalists, next_after=next_after)
+
+def parse_time_arg(name):
+    """ISO 8601 query parameter -> datetime (None if absent); ValueError if malformed."""
+    value = request.args.get(name)
+    return datetime.fromisoformat(value) if value else None
+
+@app.route("/journalists", methods=["GET"])
+def list_journalists():
+    """Journalists in id order with interaction counts; follow ?after=<next_after>."""
+    with Session() as session:
+        journalists, next_after = history.journalist_page(
+            session, after=request.args.get('after', type=int), limit=request.args.get('limit', type=int))
+        stats = history.journalist_stats(session, [j.id for j in journalists])
+        return jsonify({'journalists': [history.journalist_to_dict(j, stats[j.id]) for j in journalists],
+                        'next_after': next_after})
+
+@app.route("/journalists/<int:journalist_id>/stats", methods=["GET"])
+def get_journalist_stats(journalist_id):
+    with Session() as session:
+        journalist = session.get(Journalist, journalist_id)
+        if journalist is None:
+            return jsonify({'error': 'journalist not found'}), 404
+        stats = history.journalist_stats(session, [journalist_id])[journalist_id]
+        return jsonify(history.journalist_to_dict(journalist, stats))
+
+@app.route("/interactions", methods=["GET"])
+def list_interactions():
+    """
+    Newest interactions first. Filters: journalist_id, since, until (ISO 8601, on created_at).
+    Follow ?before=<next_before> for older pages.
+    """
+    try:
+        since, until = parse_time_arg('since'), parse_time_arg('until')
+    except ValueError as e:
+        return jsonify({'error': f"invalid time range: {e}"}), 400
+    with Session() as session:
+        interactions, next_before = history.interaction_page(
+            session,
+            journalist_id=request.args.get('journalist_id', type=int),
+            since=since,
+            until=until,
+            before=request.args.get('before', type=int),
+            limit=request.args.get('limit', type=int),
+        )
+        return jsonify({'interactions': [history.interaction_to_dict(i) for i in interactions],
+                        'next_before': next_before})
+
+def generate_persona_responses(session, pitch, journalist_ids):
+    """Yields one {'name', 'response'} per known journalist and queues its Interaction row."""
+    analysis = None  # Journalist-independent, so computed at most once per request
+    for jid in journalist_ids:
+        journalist = session.get(Journalist, int(jid))  # SQLAlchemy 2.0: use session.get()
+        if journalist:
+            if analysis is None:
+                analysis = analyze_pitch(pitch)
+                record = analysis_record(analysis)
+            resp = render_response(journalist, analysis)
+            interaction_writer.add(journalist.id, pitch, resp, analysis=record)
+            yield {
+                'name': journalist.name,
+                'response': resp
+            }
+
+def stream_format(data):
+    """'ndjson', 'sse' or None, from ?stream=, the JSON body's "stream" key, or the Accept header."""
+    fmt = request.args.get('stream') or data.get('stream')
+    if fmt in ('ndjson', 'sse'):
+        return fmt
+    if fmt:
+        return 'ndjson'
+    accept = request.headers.get('Accept', '')
+    if 'text/event-stream' in accept:
+        return 'sse'
+    if 'application/x-ndjson' in accept:
+        return 'ndjson'
+    return None
+
+def stream_persona_responses(pitch, journalist_ids, fmt):
+    def encode(obj, event=None):
+        payload = json.dumps(obj)
+        if fmt == 'sse':
+            return (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+        return payload + "\n"
+
+    def generate():
+        count = 0
+        with Session() as session:
+            for item in generate_persona_responses(session, pitch, journalist_ids):
+                count += 1
+                yield encode(item)
+        yield encode({'done': True, 'count': count}, event='done')
+
+    mimetype = 'text/event-stream' if fmt == 'sse' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route("/query_persona", methods=["POST"])
 def query_persona():
     data = request.get_json()
     pitch = data.get('pitch', '')
     journalist_ids = data.get('journalists', [])
-    responses = []
+    fmt = stream_format(data)
+    if fmt:
+        return stream_persona_responses(pitch, journalist_ids, fmt)
     with Session() as session:
-        for jid in journalist_ids:
-            journalist = session.get(Journalist, int(jid))  # SQLAlchemy 2.0: use session.get()
-            if journalist:
-                resp = persona_response(journalist, pitch)
-                interaction = Interaction(journalist_id=journalist.id, pitch=pitch, response=resp)
-                session.add(interaction)
-                responses.append({
-                    'name': journalist.name,
-                    'response': resp
-                })
-        session.commit()
+        responses = list(generate_persona_responses(session, pitch, journalist_ids))
     return jsonify({'responses': responses})
 
+@app.route("/match_journalists", methods=["POST"])
+def match_journalists():
+    """Ranks journalists by TF-IDF cosine similarity between the pitch and their profile."""
+    data = request.get_json()
+    pitch = data.get('pitch', '')
+    k = max(1, min(int(data.get('k', 10)), 1000))
+    with Session() as session:
+        try:
+            index = journalist_index.get_index(session)
+        except journalist_index.IndexNotBuilt as e:
+            return jsonify({'error': str(e)}), 503
+        matches = index.search(pitch, k)
+        names = dict(session.query(Journalist.id, Journalist.name)
+                     .filter(Journalist.id.in_([jid for jid, _ in matches])).all())
+    return jsonify({'matches': [
+        {'id': jid, 'name': names.get(jid), 'score': round(score, 4)}
+        for jid, score in matches if jid in names
+    ]})
+
+@app.route("/jobs/query_persona", methods=["POST"])
+def submit_query_persona():
+    """Asynchronous /query_persona: queue the work and return a job ID to poll."""
+    data = request.get_json()
+    with Session() as session:
+        job_id = job_queue.submit_job(session, data.get('pitch', ''), data.get('journalists', []))
+        session.commit()
+    return jsonify({'job_id': job_id, 'status': job_queue.QUEUED,
+                    'status_url': f"/jobs/{job_id}"}), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    with Session() as session:
+        status = job_queue.job_status(session, job_id)
+    if status is None:
+        return jsonify({'error': 'job not found'}), 404
+    return jsonify(status)
+
+@app.route("/conversations", methods=["POST"])
+def start_conversation():
+    data = request.get_json()
+    with Session() as session:
+        if session.get(Journalist, int(data.get('journalist_id', 0))) is None:
+            return jsonify({'error': 'journalist not found'}), 404
+        conversation = conversations.start_conversation(session, int(data['journalist_id']))
+        session.commit()
+        return jsonify({'conversation_id': conversation.id,
+                        'turns_url': f"/conversations/{conversation.id}/turns"}), 201
+
+@app.route("/conversations/<int:conversation_id>/turns", methods=["POST"])
+def add_conversation_turn(conversation_id):
+    data = request.get_json()
+    with Session() as session:
+        conversation = session.get(Conversation, conversation_id)
+        if conversation is None:
+            return jsonify({'error': 'conversation not found'}), 404
+        try:
+            turn, response = conversations.add_turn(session, conversation, data.get('pitch', ''))
+        except conversations.ConversationConflict as e:
+            session.rollback()
+            return jsonify({'error': str(e)}), 409
+        session.commit()
+    return jsonify({'conversation_id': conversation_id, 'turn': turn, 'response': response})
+
+@app.route("/conversations/<int:conversation_id>/turns", methods=["GET"])
+def get_conversation_turns(conversation_id):
+    """Newest turns first; follow ?before=<next_before> for older pages."""
+    with Session() as session:
+        if session.get(Conversation, conversation_id) is None:
+            return jsonify({'error': 'conversation not found'}), 404
+        page = conversations.history_page(session, conversation_id,
+                                          before=request.args.get('before', type=int),
+                                          limit=request.args.get('limit', 20, type=int))
+    return jsonify(dict(page, conversation_id=conversation_id))
+
 @app.route('/arch')
 def arch():
     mmd_folder = os.path.join(app.root_path, 'mmd')
-    diagrams = []
 
-    for filename in os.listdir(mmd_folder):
-        if filename.endswith('.mmd'):
-            with open(os.path.join(mmd_folder, filename, ), 'r', encoding='utf-8') as f:
-                diagrams.append(f.read())
+    def render():
+        diagrams = []
+        for filename in os.listdir(mmd_folder):
+            if filename.endswith('.mmd'):
+                with open(os.path.join(mmd_folder, filename, ), 'r', encoding='utf-8') as f:
+                    diagrams.append(f.read())
+        return render_template("arch.html", diagrams=diagrams)
 
-    return render_template("arch.html", diagrams=diagrams)
+    return doc_pages.respond(request, 'arch', [mmd_folder, TEMPLATE_DIR], render)
 
 @app.route('/plan')
 def timeline():
-    return render_template("timeline.html")
+    return doc_pages.respond(request, 'plan', [TEMPLATE_DIR], lambda: render_template("timeline.html"))
 
 @app.route('/persona')
 def persona():
-    persona_folder = os.path.join(app.root_path, 'doc/persona')
-    personas = []
-
-    for filename in os.listdir(persona_folder):
-        if filename.endswith('.json'):
-            with open(os.path.join(persona_folder, filename), 'r', encoding='utf-8') as f:
-                personas.append({
-                    'name': filename[:-5],  # Remove .json extension
-                    'content': f.read()
-                })
-
-    return render_template("persona.html", personas=personas)
+    def render():
+        persona_documents.refresh(force=True)  # the page cache has just seen a change on disk
+        personas = [{'name': doc.name, 'content': doc.text} for doc in persona_documents.documents()]
+        return render_template("persona.html", personas=personas)
+
+    return doc_pages.respond(request, 'persona', [persona_documents.directory, TEMPLATE_DIR], render)
 
 if __name__ == "__main__":
     app.run(debug=True, port=8000)
\ No newline at end of file
@@ -0,0 +1,258 @@
+"""
+Load generator for the Flask app, reporting throughput and latency percentiles per endpoint.
+
+In-process (Flask test client, stub models, throwaway database seeded with 500 journalists):
+    python benchmarks/loadtest.py --stub-models --seed-journalists 500 --concurrency 8 --fanout 1,10,50
+
+Against a running server (start it with PERSONA_STUB_MODELS=1 for a model-free run):
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --concurrency 16 --duration 30
+
+Each (endpoint, fan-out) scenario runs for --duration seconds or --requests requests,
+whichever comes first, with --concurrency client threads.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_PITCHES = [
+    "We've just launched TaskPilot, a smart task coordination platform built by ex-Slack and Trello "
+    "engineers that replaces status meetings with async updates. Our co-founder Maya Chen is available for interviews.",
+    "EcoCharge, the world's first fully biodegradable portable phone charger, is now available for pre-order. "
+    "Over 10,000 units were reserved in the first month; founder Lisa Tran can talk sustainability.",
+    "Artly is a new AI-powered app that turns sketches into polished illustrations. It has 15,000 designers "
+    "and students on board, and CTO Dr. Rahul Gupta can discuss AI and creativity.",
+    "WellNest, a mental wellness platform, just raised $12M in Series A funding led by Thrive Ventures. "
+    "CEO Priya Desai is available for a story on the growth of digital wellness.",
+    "Shoply is an e-commerce analytics tool helping small businesses boost online sales with real-time data. "
+    "Customers report a 25% increase in conversions.",
+]
+
+INTERESTS = ("tech startups AI gadgets consumer-electronics marketing branding social-media finance health "
+             "climate energy policy retail e-commerce wellness sustainability design creativity").split()
+
+def load_pitches(path):
+    if not path:
+        return DEFAULT_PITCHES
+    pitches = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            pitches.append(json.loads(line)["pitch"] if line.startswith("{") else line)
+    return pitches
+
+def seed_journalists(database_url, count):
+    """Inserts `count` synthetic journalists in chunks through Core executemany."""
+    from sqlalchemy import insert
+    from models import Journalist
+    from storage import make_engine, migrate
+
+    engine = make_engine(database_url)
+    migrate(engine)
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        for start in range(0, count, 5000):
+            conn.execute(insert(Journalist), [
+                {"name": f"Synthetic Journalist {i}",
+                 "interests": ", ".join(rng.sample(INTERESTS, 3)),
+                 "style": rng.choice(["formal, analytical", "conversational, engaging", "inquisitive, neutral"]),
+                 "sample_articles": None}
+                for i in range(start, min(start + 5000, count))
+            ])
+    engine.dispose()
+
+def journalist_ids(database_url):
+    from sqlalchemy import select
+    from models import Journalist
+    from storage import make_engine
+
+    engine = make_engine(database_url)
+    with engine.connect() as conn:
+        ids = [row[0] for row in conn.execute(select(Journalist.id))]
+    engine.dispose()
+    return ids
+
+# --- Transports ----------------------------------------------------------------------
+
+class InProcessClient:
+    """One Flask test client per thread; measures the app without a network or WSGI server."""
+    def __init__(self):
+        import app
+        self.app = app.app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        response.get_data()  # drain streamed bodies
+        return response.status_code
+
+class HttpClient:
+    def __init__(self, base_url, timeout=120):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"} if data else {})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+# --- Runner --------------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def run_scenario(client, endpoint, fanout, pitches, ids, concurrency, duration, max_requests):
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    issued = [0]
+    deadline = time.monotonic() + duration
+
+    def next_request():
+        with lock:
+            if issued[0] >= max_requests or time.monotonic() >= deadline:
+                return None
+            issued[0] += 1
+        if endpoint == "/":
+            return "GET", "/", None
+        body = {"pitch": random.choice(pitches), "journalists": random.sample(ids, min(fanout, len(ids)))}
+        if endpoint == "/match_journalists":
+            body = {"pitch": body["pitch"], "k": fanout}
+        return "POST", endpoint, body
+
+    def worker():
+        nonlocal errors
+        while True:
+            req = next_request()
+            if req is None:
+                return
+            start = time.perf_counter()
+            try:
+                status = client.request(*req)
+            except Exception:
+                status = None
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if status is None or status >= 400:
+                    errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    return {
+        "endpoint": endpoint, "fanout": fanout if endpoint != "/" else None, "concurrency": concurrency,
+        "requests": len(latencies), "errors": errors, "seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "p50_ms": ms(percentile(latencies, 50)), "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)), "max_ms": ms(latencies[-1] if latencies else None),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="drive a running server instead of the in-process test client")
+    parser.add_argument("--endpoints", default="/,/query_persona", help="comma-separated: /, /query_persona, /match_journalists")
+    parser.add_argument("--concurrency", default="8", help="comma-separated list, e.g. 1,8,32")
+    parser.add_argument("--fanout", default="1,10", help="comma-separated journalists per /query_persona request")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--requests", type=int, default=10 ** 9, help="max requests per scenario")
+    parser.add_argument("--pitches", help="pitch corpus: JSONL with a 'pitch' field, or one pitch per line")
+    parser.add_argument("--stub-models", action="store_true", help="in-process: use stub NLP models")
+    parser.add_argument("--cold-cache", action="store_true", help="in-process: disable the pitch analysis cache")
+    parser.add_argument("--database-url", help="database to use/seed (default: a temporary SQLite file in-process)")
+    parser.add_argument("--seed-journalists", type=int, default=0, help="insert N synthetic journalists first")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    random.seed(0)
+    tmpdir = None
+    if not args.url:
+        if not args.database_url:
+            tmpdir = tempfile.TemporaryDirectory()
+            args.database_url = f"sqlite:///{os.path.join(tmpdir.name, 'loadtest.db')}"
+            os.environ.setdefault("PERSONA_CACHE_DB", "")
+            os.environ.setdefault("PERSONA_JOURNALIST_INDEX", os.path.join(tmpdir.name, "journalist_index"))
+        os.environ["PERSONA_DATABASE_URL"] = args.database_url
+        if args.stub_models:
+            os.environ["PERSONA_STUB_MODELS"] = "1"
+
+    if args.seed_journalists:
+        if not args.database_url:
+            parser.error("--seed-journalists with --url needs --database-url pointing at the server's database")
+        started = time.perf_counter()
+        seed_journalists(args.database_url, args.seed_journalists)
+        print(f"Seeded {args.seed_journalists} journalists in {time.perf_counter() - started:.1f}s")
+
+    if args.url:
+        client = HttpClient(args.url)
+        ids = journalist_ids(args.database_url) if args.database_url else list(range(1, 4))
+    else:
+        client = InProcessClient()
+        if args.cold_cache:
+            import analysis_cache
+            analysis_cache.configure(max_entries=0)
+        ids = journalist_ids(args.database_url)
+    if not ids:
+        parser.error("no journalists in the database; pass --seed-journalists N")
+
+    pitches = load_pitches(args.pitches)
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    if "/match_journalists" in endpoints and not args.url:
+        # The route only serves a saved index, as in production after `python journalist_index.py`
+        from journalist_import import rebuild_index
+        from storage import make_engine
+
+        engine = make_engine(args.database_url)
+        started = time.perf_counter()
+        print(f"Indexed {rebuild_index(engine)} journalists in {time.perf_counter() - started:.1f}s")
+        engine.dispose()
+    fanouts = [int(f) for f in args.fanout.split(",")]
+    results = []
+    print(f"{'endpoint':<20} {'fanout':>6} {'conc':>5} {'reqs':>7} {'err':>5} {'rps':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        for endpoint in endpoints:
+            for fanout in (fanouts if endpoint != "/" else [None]):
+                r = run_scenario(client, endpoint, fanout or 0, pitches, ids, concurrency,
+                                 args.duration, args.requests)
+                results.append(r)
+                print(f"{endpoint:<20} {fanout or '-':>6} {concurrency:>5} {r['requests']:>7} {r['errors']:>5} "
+                      f"{r['throughput_rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url or "in-process", "journalists": len(ids), "results": results}, f, indent=2)
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+if __name__ == "__main__":
+    main()
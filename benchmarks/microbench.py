@@ -0,0 +1,334 @@
+"""
+Microbenchmarks for the persona and NLP hot paths.
+
+    python benchmarks/microbench.py run --output bench/base.json            # stub models, offline
+    python benchmarks/microbench.py run --real-models --output real.json    # spaCy + distilbart
+    python benchmarks/microbench.py compare bench/base.json bench/new.json  # exit 1 on regression
+
+Each case is timed like timeit: the iteration count is calibrated so one round takes at
+least --min-time seconds, then --rounds rounds are run and the per-call min/median/mean
+recorded. Compare medians between commits; min is the least noisy on shared machines.
+
+Quality checks run alongside: journalist index precision@1 for single-interest queries
+on synthetic rosters. `run` exits 1 when one falls below QUALITY_FLOOR, and `compare`
+flags any drop from the base file.
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'alt')]
+
+PERSONA_PATH = os.path.join(ROOT, 'doc', 'persona', 'v2.json')
+OBSERVATIONS_PATH = os.path.join(ROOT, 'alt', 'observation_data.json')
+
+QUALITY_FLOOR = 0.95
+
+WORDS = ("launch platform startup funding AI remote teams customers growth product founder "
+         "interview exclusive data privacy market analytics sustainability users beta").split()
+
+class Journalist:
+    """Stand-in for models.Journalist so benchmarks don't need a database."""
+    def __init__(self, i):
+        self.id = i
+        self.name = f"Journalist {i}"
+        self.interests = ", ".join(random.sample(WORDS, 3))
+        self.style = "formal, analytical"
+        self.sample_articles = None
+
+def make_pitch(n_words):
+    names = ["TaskPilot", "Maya Chen", "Acme Corp", "Series A"]
+    words = [random.choice(WORDS) for _ in range(n_words)]
+    for i in range(0, n_words, 25):
+        words[i] = random.choice(names)
+    return " ".join(words)
+
+def timed(fn, rounds, min_time):
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {"min": min(samples), "median": statistics.median(samples),
+            "mean": statistics.fmean(samples), "rounds": rounds, "number": number}
+
+# --- Cases ---------------------------------------------------------------------------
+# Each case yields (name, params, zero-argument callable).
+
+def persona_response_cases(quick):
+    import ai_persona
+    import analysis_cache
+
+    lengths = [50, 400] if quick else [50, 200, 1000]
+    fanouts = [1, 10] if quick else [1, 10, 50]
+    for n_words in lengths:
+        pitch = make_pitch(n_words)
+        journalist = Journalist(1)
+        yield ("ai_persona.analyze_pitch", {"pitch_words": n_words, "cache": False},
+               lambda pitch=pitch: ai_persona.analyze_pitch(pitch, use_cache=False))
+        ai_persona.analyze_pitch(pitch)  # prime the cache
+        yield ("ai_persona.analyze_pitch", {"pitch_words": n_words, "cache": True},
+               lambda pitch=pitch: ai_persona.analyze_pitch(pitch))
+        analysis = ai_persona.analyze_pitch(pitch, use_cache=False)
+        yield ("ai_persona.render_response", {"pitch_words": n_words},
+               lambda analysis=analysis: ai_persona.render_response(journalist, analysis))
+        for fanout in fanouts:
+            journalists = [Journalist(i) for i in range(fanout)]
+
+            def fan_out(pitch=pitch, journalists=journalists):
+                # Mirrors app.generate_persona_responses: one analysis, N renders
+                analysis = ai_persona.analyze_pitch(pitch, use_cache=False)
+                return [ai_persona.render_response(j, analysis) for j in journalists]
+            yield ("ai_persona.persona_response.fanout",
+                   {"pitch_words": n_words, "journalists": fanout}, fan_out)
+    analysis_cache.get_cache().clear()
+
+def scaled_persona(scale):
+    """v2.json with its list-valued sections and criteria repeated `scale` times."""
+    from persona_model import Persona
+
+    with open(PERSONA_PATH, encoding='utf-8') as f:
+        data = json.load(f)
+    if scale > 1:
+        def grow(node):
+            if isinstance(node, dict):
+                for key, value in list(node.items()):
+                    if isinstance(value, list) and value and isinstance(value[0], dict):
+                        node[key] = [dict(item, **({"name": f"{item['name']} {k}"} if "name" in item else {}))
+                                     for k in range(scale) for item in value]
+                    else:
+                        grow(value)
+        grow(data)
+        criteria = data['interaction_protocols']['pitch_assessment_criteria']['criteria_breakdown']
+        for name, definition in list(criteria.items()):
+            for k in range(1, scale):
+                criteria[f"{name} {k}"] = copy.deepcopy(definition)
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+        json.dump(data, f)
+    with contextlib.redirect_stdout(io.StringIO()):
+        persona = Persona(f.name)
+    os.unlink(f.name)
+    return persona
+
+PITCH_DETAILS = {
+    "title": "Investigative Report: Hidden Costs of a Policy",
+    "summary": "Our investigation uncovers financial irregularities with corroborating documents.",
+    "keywords": ["investigation", "accountability", "unique_angle", "breaking"],
+    "data_provided": True, "potential_impact": 0.9, "source_reputation": 0.95, "ethical_alignment": True,
+}
+
+def persona_cases(quick):
+    from persona_bank import PersonaBank
+
+    for scale in ([1, 10] if quick else [1, 10, 100]):
+        persona = scaled_persona(scale)
+        yield ("Persona.assess_pitch", {"persona_scale": scale},
+               lambda p=persona: p.assess_pitch(PITCH_DETAILS))
+        yield ("Persona.generate_response", {"persona_scale": scale},
+               lambda p=persona: p.generate_response("What about media freedom?", "crisis, accountability"))
+        yield ("Persona.ask_question", {"persona_scale": scale},
+               lambda p=persona: p.ask_question("unemployment", "press conference"))
+    for n_personas in ([10] if quick else [10, 100]):
+        bank = PersonaBank([scaled_persona(1) for _ in range(n_personas)])
+        pitches = [dict(PITCH_DETAILS, potential_impact=random.random()) for _ in range(100)]
+        yield ("PersonaBank.score", {"personas": n_personas, "pitches": len(pitches)},
+               lambda bank=bank, pitches=pitches: bank.score(pitches))
+
+def weight_cases(quick, workdir):
+    from weight_calculator import calculate_attribute_weights
+
+    with open(OBSERVATIONS_PATH, encoding='utf-8') as f:
+        observations = json.load(f)
+    for count in ([1000, 10000] if quick else [1000, 10000, 100000]):
+        path = os.path.join(workdir, f"observations-{count}.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(count):
+                f.write(json.dumps(observations[i % len(observations)]) + "\n")
+        out = os.path.join(workdir, "weighted.json")
+
+        def run(path=path, out=out):
+            with contextlib.redirect_stdout(io.StringIO()):
+                calculate_attribute_weights(path, out, PERSONA_PATH)
+        yield ("weight_calculator.calculate_attribute_weights", {"observations": count}, run)
+
+def journalist_index_cases(quick):
+    from journalist_index import JournalistIndex
+
+    for count in ([10000] if quick else [10000, 100000]):
+        index = JournalistIndex().build(Journalist(i) for i in range(count))
+        pitch = make_pitch(200)
+        yield ("JournalistIndex.search", {"journalists": count, "pitch_words": 200},
+               lambda index=index, pitch=pitch: index.search(pitch, 10))
+
+def journalist_index_precision(count, vocabulary, queries=500):
+    """
+    Share of single-interest queries whose top match has that interest, over `count`
+    journalists with 3 interests each drawn from `vocabulary` distinct terms.
+    """
+    from journalist_index import JournalistIndex
+
+    rng = random.Random(count * 31 + vocabulary)
+    terms = [f"topic{i}" for i in range(vocabulary)]
+    journalists = []
+    for i in range(count):
+        journalist = Journalist(i)
+        journalist.interests = ", ".join(rng.sample(terms, 3))
+        journalist.style = rng.choice(["formal, analytical", "conversational, engaging", "inquisitive, neutral"])
+        journalists.append(journalist)
+    index = JournalistIndex().build(journalists)
+    interests = {j.id: set(j.interests.split(", ")) for j in journalists}
+    hits = 0
+    for _ in range(queries):
+        term = rng.choice(sorted(interests[rng.randrange(count)]))
+        top = index.search(term, 1)
+        hits += bool(top) and term in interests[top[0][0]]
+    return hits / queries
+
+def quality_cases(quick):
+    sizes = [(5000, 300), (5000, 3000), (5000, 20000)]
+    if not quick:
+        sizes.append((20000, 20000))
+    for count, vocabulary in sizes:
+        yield ("JournalistIndex.precision_at_1", {"journalists": count, "vocabulary": vocabulary},
+               lambda count=count, vocabulary=vocabulary: journalist_index_precision(count, vocabulary))
+
+def run(args):
+    random.seed(args.seed)
+    import model_registry
+    if not args.real_models:
+        model_registry.use_stub_models()
+    else:
+        model_registry.warmup()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        groups = [persona_response_cases(args.quick), persona_cases(args.quick), weight_cases(args.quick, workdir),
+                  journalist_index_cases(args.quick)]
+        for group in groups:
+            for name, params, fn in group:
+                if args.filter and args.filter not in name:
+                    continue
+                stats = timed(fn, args.rounds, args.min_time)
+                results.append(dict(name=name, params=params, **stats))
+                label = ", ".join(f"{k}={v}" for k, v in params.items())
+                print(f"{name:<48} {label:<36} median {stats['median'] * 1e3:10.3f} ms")
+
+    quality = []
+    for name, params, fn in quality_cases(args.quick):
+        if args.filter and args.filter not in name:
+            continue
+        value = fn()
+        quality.append(dict(name=name, params=params, value=value))
+        label = ", ".join(f"{k}={v}" for k, v in params.items())
+        flag = "" if value >= QUALITY_FLOOR else f"  BELOW {QUALITY_FLOOR}"
+        print(f"{name:<48} {label:<36} {value:16.3f}{flag}")
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "models": model_registry.registry.model_ids(["nlp", "summarizer"]),
+            "quick": args.quick,
+        },
+        "results": results,
+        "quality": quality,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(results)} results to {args.output}")
+    return 1 if any(q["value"] < QUALITY_FLOOR for q in quality) else 0
+
+def _key(result):
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+def compare(args):
+    with open(args.base, encoding='utf-8') as f:
+        base_report = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new_report = json.load(f)
+    base = {_key(r): r for r in base_report["results"]}
+    new = new_report["results"]
+
+    regressions = 0
+    print(f"{'benchmark':<84} {'base ms':>10} {'new ms':>10} {'change':>8}")
+    for result in new:
+        old = base.get(_key(result))
+        if old is None:
+            continue
+        change = result[args.stat] / old[args.stat] - 1 if old[args.stat] else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -args.threshold:
+            flag = "  faster"
+        label = result["name"] + " " + ", ".join(f"{k}={v}" for k, v in result["params"].items())
+        print(f"{label:<84} {old[args.stat] * 1e3:10.3f} {result[args.stat] * 1e3:10.3f} {change:+8.1%}{flag}")
+
+    base_quality = {_key(q): q["value"] for q in base_report.get("quality", [])}
+    for q in new_report.get("quality", []):
+        old = base_quality.get(_key(q))
+        label = q["name"] + " " + ", ".join(f"{k}={v}" for k, v in q["params"].items())
+        flag = ""
+        if q["value"] < QUALITY_FLOOR or (old is not None and q["value"] < old - 0.01):
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{label:<84} {'-' if old is None else f'{old:.3f}':>10} {q['value']:10.3f}{flag}")
+    if regressions:
+        print(f"{regressions} benchmark(s) slower than the {args.threshold:.0%} threshold or below their quality")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run the benchmarks")
+    p_run.add_argument("--output", help="write JSON results here")
+    p_run.add_argument("--real-models", action="store_true", help="use spaCy/distilbart instead of stubs")
+    p_run.add_argument("--quick", action="store_true", help="fewer, smaller input sizes")
+    p_run.add_argument("--rounds", type=int, default=5)
+    p_run.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per round")
+    p_run.add_argument("--filter", help="only run benchmarks whose name contains this")
+    p_run.add_argument("--seed", type=int, default=0)
+
+    p_cmp = sub.add_parser("compare", help="compare two result files")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=0.10, help="relative slowdown that counts as a regression")
+    p_cmp.add_argument("--stat", choices=["min", "median", "mean"], default="median")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        sys.exit(run(args))
+    else:
+        sys.exit(compare(args))
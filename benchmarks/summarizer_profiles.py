@@ -0,0 +1,113 @@
+"""
+Compares summarizer inference profiles (fp32 vs dynamic int8) on CPU.
+
+    python benchmarks/summarizer_profiles.py --threads 2 --output profiles.json
+    python benchmarks/summarizer_profiles.py --pitches pitches.jsonl --max-input-tokens 256
+
+For each profile it reports load time, serialized weight size, resident-memory growth,
+per-pitch latency (p50/p95), and how closely the summaries match fp32: exact-match rate
+and mean ROUGE-L F1 against the fp32 output.
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cpu_inference import InferenceProfile, load_summarizer, PROFILES
+from loadtest import DEFAULT_PITCHES, load_pitches
+from model_registry import SUMMARIZER_MODEL
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def rouge_l_f1(candidate, reference):
+    a, b = candidate.lower().split(), reference.lower().split()
+    if not a or not b:
+        return float(a == b)
+    prev = [0] * (len(b) + 1)
+    for x in a:
+        cur = [0]
+        for j, y in enumerate(b):
+            cur.append(prev[j] + 1 if x == y else max(prev[j + 1], cur[j]))
+        prev = cur
+    lcs = prev[-1]
+    if lcs == 0:
+        return 0.0
+    precision, recall = lcs / len(a), lcs / len(b)
+    return 2 * precision * recall / (precision + recall)
+
+def weight_bytes(model):
+    import torch
+    buf = io.BytesIO()
+    torch.save(model.state_dict(), buf)
+    return buf.tell()
+
+def run_profile(name, pitches, args):
+    profile = InferenceProfile(name, intra_threads=args.threads, interop_threads=args.interop_threads,
+                               max_input_tokens=args.max_input_tokens)
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    summarizer = load_summarizer(args.model, profile)
+    load_seconds = time.perf_counter() - started
+    rss_after = rss_mb()
+
+    summarizer(pitches[0])  # warm-up, excluded from timings
+    latencies, summaries = [], []
+    for pitch in pitches:
+        started = time.perf_counter()
+        summaries.append(summarizer(pitch, max_length=32, min_length=10, do_sample=False)[0]["summary_text"])
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "profile": name,
+        "load_seconds": round(load_seconds, 2),
+        "weights_mb": round(weight_bytes(summarizer.model) / 2 ** 20, 1),
+        "rss_growth_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000, 1),
+    }, summaries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=SUMMARIZER_MODEL)
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--pitches", help="JSONL with a 'pitch' field, or one pitch per line")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--interop-threads", type=int, default=None)
+    parser.add_argument("--max-input-tokens", type=int, default=512)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    pitches = load_pitches(args.pitches) if args.pitches else DEFAULT_PITCHES
+    results, outputs = [], {}
+    for name in args.profiles.split(","):
+        result, outputs[name] = run_profile(name, pitches, args)
+        results.append(result)
+
+    baseline = outputs.get("fp32")
+    for result in results:
+        if baseline is not None:
+            mine = outputs[result["profile"]]
+            result["exact_match_vs_fp32"] = round(sum(a == b for a, b in zip(mine, baseline)) / len(baseline), 3)
+            result["rouge_l_vs_fp32"] = round(statistics.fmean(rouge_l_f1(a, b) for a, b in zip(mine, baseline)), 3)
+        print(json.dumps(result))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "pitches": len(pitches), "threads": args.threads,
+                       "max_input_tokens": args.max_input_tokens, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
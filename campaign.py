@@ -0,0 +1,248 @@
+"""
+Offline campaign runner: many pitches against many journalists, without the web tier.
+
+    python campaign.py pitches.jsonl --output results.jsonl --workers 4
+    python campaign.py pitches.jsonl --output results.jsonl --journalists 1,2,3 --store-interactions
+
+Each input line is {"pitch": "...", "id": optional, "journalists": optional [ids]}
+(a plain text line is also accepted); `id` defaults to the line number and
+`journalists` to --journalists (all journalists when not given). Pitches are analyzed
+in batches, one nlp.pipe pass and one batched summarizer call per batch, across a pool
+of worker processes that share the preloaded models. Each output line holds one pitch:
+
+    {"pitch_id", "topics", "summary", "responses": [{"journalist_id", "name", "response"}]}
+
+Only a bounded number of batches is in flight and output is written as batches finish,
+so memory does not grow with the input. Malformed input lines are reported and skipped.
+--resume skips pitch IDs already present in the output; --store-interactions also
+bulk-inserts the responses as Interaction rows, keyed by campaign (--campaign, default the
+output path), pitch ID and journalist, so a resumed run never stores a response twice.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import Interaction, Journalist
+from storage import DATABASE_URL, make_engine, migrate, pitch_ids
+
+BATCH_SIZE = 16
+
+class CampaignJournalist:
+    """The Journalist fields render_response reads, cheap to send to worker processes."""
+    __slots__ = ("id", "name", "interests", "style")
+
+    def __init__(self, id, name, interests, style):
+        self.id = id
+        self.name = name
+        self.interests = interests
+        self.style = style
+
+def load_journalists(engine, ids=None):
+    query = select(Journalist.id, Journalist.name, Journalist.interests, Journalist.style).order_by(Journalist.id)
+    if ids:
+        query = query.where(Journalist.id.in_(ids))
+    with engine.connect() as conn:
+        return {row.id: CampaignJournalist(*row) for row in conn.execute(query)}
+
+def read_pitches(path, report=None, log=sys.stderr):
+    """
+    Yields (pitch_id, pitch_text, journalist_ids or None) one line at a time. Malformed
+    lines are skipped, counted in report["invalid"] and the first 20 printed to `log`.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if not line.startswith("{"):
+                yield str(line_no), line, None
+                continue
+            try:
+                item = json.loads(line)
+                pitch, ids = item["pitch"], item.get("journalists")
+            except json.JSONDecodeError as e:
+                problem = f"invalid JSON ({e.msg})"
+            except KeyError:
+                problem = "missing pitch"
+            else:
+                if isinstance(pitch, str) and (ids is None or isinstance(ids, list)):
+                    yield str(item.get("id", line_no)), pitch, ids
+                    continue
+                problem = "pitch must be a string and journalists a list"
+            if report is not None:
+                report["invalid"] = report.get("invalid", 0) + 1
+                if report["invalid"] > 20:
+                    continue
+            print(f"Skipping line {line_no}: {problem}", file=log)
+
+def completed_pitch_ids(output_path):
+    """
+    Pitch IDs already in the output. A trailing partial line left by an interrupted run
+    is cut off so appended output starts on a fresh line.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        good_end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                done.add(json.loads(line)["pitch_id"])
+            except (ValueError, KeyError):
+                break
+            good_end += len(line)
+        f.truncate(good_end)
+    return done
+
+# --- Worker side ---------------------------------------------------------------------
+
+_journalists = {}
+
+def _init_worker(journalists, workers):
+    global _journalists
+    from cpu_inference import configure_worker_threads
+
+    _journalists = journalists
+    configure_worker_threads(workers)
+
+def run_batch(batch, default_ids):
+    """Analyzes one batch of (pitch_id, text, journalist_ids) and renders every response."""
+    from ai_persona import analysis_record, analyze_pitches, render_response
+
+    analyses = analyze_pitches([text for _, text, _ in batch])
+    results = []
+    for (pitch_id, text, ids), analysis in zip(batch, analyses):
+        responses = []
+        for jid in ids or default_ids:
+            journalist = _journalists.get(int(jid))
+            if journalist is not None:
+                responses.append({"journalist_id": journalist.id, "name": journalist.name,
+                                  "response": render_response(journalist, analysis)})
+        results.append({"pitch_id": pitch_id, "pitch": text, "analysis": analysis_record(analysis),
+                        "responses": responses})
+    return results
+
+# --- Driver --------------------------------------------------------------------------
+
+def campaign_key(campaign, pitch_id, journalist_id):
+    return hashlib.sha256(f"{campaign}\0{pitch_id}\0{journalist_id}".encode("utf-8")).hexdigest()
+
+def store_interactions(engine, results, campaign):
+    """
+    One transaction per batch: the pitches (with their analysis) once, then every response
+    row. Rows whose campaign key is already stored (a batch stored before an interrupted
+    run wrote its output) are left alone.
+    """
+    with engine.begin() as conn:
+        ids = pitch_ids(conn, {r["pitch"] for r in results}, {r["pitch"]: r["analysis"] for r in results})
+        now = datetime.utcnow()
+        rows = [{"journalist_id": resp["journalist_id"], "pitch_id": ids[r["pitch"]],
+                 "response": resp["response"], "created_at": now,
+                 "campaign_key": campaign_key(campaign, r["pitch_id"], resp["journalist_id"])}
+                for r in results for resp in r["responses"]]
+        if not rows:
+            return
+        dialect = {"sqlite": sqlite, "postgresql": postgresql}.get(conn.dialect.name)
+        if dialect is not None:
+            conn.execute(dialect.insert(Interaction).on_conflict_do_nothing(index_elements=["campaign_key"]), rows)
+        else:
+            stored = set(conn.execute(select(Interaction.campaign_key).where(
+                Interaction.campaign_key.in_([row["campaign_key"] for row in rows]))).scalars())
+            rows = [row for row in rows if row["campaign_key"] not in stored]
+            if rows:
+                conn.execute(insert(Interaction), rows)
+
+def _batches(pitches, skip, size):
+    batch = []
+    for item in pitches:
+        if item[0] in skip:
+            continue
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def run_campaign(input_path, output_path, journalist_ids=None, workers=1, batch_size=BATCH_SIZE,
+                 resume=False, database_url=DATABASE_URL, store=False, campaign=None, log=sys.stderr):
+    engine = make_engine(database_url)
+    campaign = campaign or os.path.abspath(output_path)
+    migrate(engine)
+    journalists = load_journalists(engine, journalist_ids)
+    default_ids = list(journalist_ids or journalists)
+    skip = completed_pitch_ids(output_path) if resume else set()
+    if skip:
+        print(f"Resuming: {len(skip)} pitches already done", file=log)
+
+    report = {"pitches": 0, "responses": 0, "skipped": len(skip), "invalid": 0}
+    started = time.perf_counter()
+    batches = _batches(read_pitches(input_path, report, log), skip, batch_size)
+
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+        def write(results):
+            if store:
+                store_interactions(engine, results, campaign)
+            for r in results:
+                out.write(json.dumps({"pitch_id": r["pitch_id"], "topics": r["analysis"]["topics"],
+                                      "summary": r["analysis"]["summary"], "responses": r["responses"]}) + "\n")
+                report["responses"] += len(r["responses"])
+            out.flush()
+            report["pitches"] += len(results)
+            elapsed = time.perf_counter() - started
+            print(f"{report['pitches']} pitches, {report['pitches'] / elapsed:.1f} pitches/s", file=log)
+
+        if workers <= 1:
+            _init_worker(journalists, 1)
+            for batch in batches:
+                write(run_batch(batch, default_ids))
+        else:
+            context = multiprocessing.get_context()
+            if context.get_start_method() == "fork":
+                from model_registry import preload_for_fork
+                preload_for_fork()  # workers share the weights copy-on-write
+            engine.dispose()
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(journalists, workers)) as pool:
+                in_flight = set()
+                for batch in batches:
+                    in_flight.add(pool.submit(run_batch, batch, default_ids))
+                    if len(in_flight) >= 2 * workers:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            write(future.result())
+                for future in in_flight:
+                    write(future.result())
+
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    report["pitches_per_second"] = round(report["pitches"] / report["seconds"], 2) if report["seconds"] else None
+    engine.dispose()
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL pitches")
+    parser.add_argument("--output", required=True, help="JSONL results")
+    parser.add_argument("--journalists", help="comma-separated journalist IDs (default: all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--resume", action="store_true", help="skip pitches already in --output")
+    parser.add_argument("--store-interactions", action="store_true")
+    parser.add_argument("--campaign", help="key for stored interactions (default: the --output path)")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args()
+
+    ids = [int(j) for j in args.journalists.split(",")] if args.journalists else None
+    print(json.dumps(run_campaign(args.input, args.output, ids, args.workers, args.batch_size,
+                                  args.resume, args.database_url, args.store_interactions, args.campaign)))
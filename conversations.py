@@ -0,0 +1,94 @@
+"""
+Multi-turn persona conversations.
+
+A turn analyzes only its own text (analyze_pitch, cached by content hash) and reads the
+rolling context window of the last PERSONA_CONTEXT_TURNS turns (default 6) from the
+conversation row, so the cost of a turn does not grow with the length of the
+conversation. The full transcript lives in the interactions table and is read a page at
+a time by keyset pagination on the interaction id, never with OFFSET.
+"""
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+
+from sqlalchemy.orm import selectinload
+
+from ai_persona import analyze_pitch, analysis_record, render_response
+from models import Conversation, Interaction
+from storage import pitch_ids
+
+CONTEXT_TURNS = int(os.environ.get('PERSONA_CONTEXT_TURNS', 6))
+MAX_PAGE_SIZE = 100
+
+class ConversationConflict(Exception):
+    """Another turn was added to the conversation first; reload it and retry."""
+
+def start_conversation(session, journalist_id):
+    """Creates an empty conversation with a journalist. The caller commits."""
+    conversation = Conversation(journalist_id=journalist_id, turn_count=0, context='[]',
+                                created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+    session.add(conversation)
+    session.flush()
+    return conversation
+
+def context_window(conversation):
+    """The last CONTEXT_TURNS turns as [{'turn', 'topics', 'summary'}], oldest first."""
+    return json.loads(conversation.context or '[]')
+
+def add_turn(session, conversation, pitch_text):
+    """
+    Answers `pitch_text` as the conversation's next turn and returns (turn, response).
+
+    Stores the Interaction row and the updated context window; the caller commits.
+    turn_count doubles as a version number: if another request added a turn since
+    `conversation` was loaded, nothing is written and ConversationConflict is raised.
+    """
+    history = context_window(conversation)
+    analysis = analyze_pitch(pitch_text)
+    response = render_response(conversation.journalist, analysis, history)
+
+    turn = conversation.turn_count + 1
+    history.append({'turn': turn, 'topics': analysis.topics, 'summary': analysis.summary})
+    now = datetime.utcnow()
+    updated = session.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation.id, Conversation.turn_count == conversation.turn_count)
+        .values(turn_count=turn, context=json.dumps(history[-CONTEXT_TURNS:]), updated_at=now)
+    ).rowcount
+    if not updated:
+        raise ConversationConflict(f"conversation {conversation.id} already has a turn {turn}")
+    pitch_id = pitch_ids(session.connection(), [pitch_text], {pitch_text: analysis_record(analysis)})[pitch_text]
+    session.execute(insert(Interaction), [{
+        'journalist_id': conversation.journalist_id,
+        'conversation_id': conversation.id,
+        'turn': turn,
+        'pitch_id': pitch_id,
+        'response': response,
+        'created_at': now,
+    }])
+    return turn, response
+
+def history_page(session, conversation_id, before=None, limit=20):
+    """
+    One page of a conversation's turns, newest first. Pass the returned `next_before`
+    back as `before` to get the next older page; it is None on the last page.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    query = (select(Interaction).options(selectinload(Interaction.stored_pitch))
+             .where(Interaction.conversation_id == conversation_id))
+    if before is not None:
+        query = query.where(Interaction.id < int(before))
+    rows = session.execute(query.order_by(Interaction.id.desc()).limit(limit + 1)).scalars().all()
+    page = rows[:limit]
+    return {
+        'turns': [{
+            'id': row.id,
+            'turn': row.turn,
+            'pitch': row.pitch_text,
+            'response': row.response,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+        } for row in page],
+        'next_before': page[-1].id if len(rows) > limit else None,
+    }
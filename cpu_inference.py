@@ -0,0 +1,104 @@
+"""
+CPU inference profile for the distilbart summarizer.
+
+Settings come from the environment so each worker can be tuned without code changes:
+
+    PERSONA_INFERENCE_PROFILE      fp32 (default) or int8 (dynamic quantization of nn.Linear)
+    PERSONA_TORCH_THREADS          intra-op threads per worker (default: torch's choice)
+    PERSONA_TORCH_INTEROP_THREADS  inter-op threads per worker
+    PERSONA_MAX_INPUT_TOKENS       pitches are truncated to this many tokens (default 512)
+
+The summarizer runs under torch.inference_mode() and truncates long pitches in the tokenizer.
+It is called the same way as the transformers pipeline it replaces:
+summarizer(text_or_texts, max_length=..., min_length=..., do_sample=False) -> [{'summary_text': ...}]
+Under gunicorn (gunicorn.conf.py) the model is loaded once in the master and every worker
+gets an even share of the cores unless PERSONA_TORCH_THREADS is set.
+Run benchmarks/summarizer_profiles.py to measure the int8 latency/accuracy trade-off
+against fp32 on your own pitches.
+"""
+import os
+import sys
+
+PROFILES = ("fp32", "int8")
+
+class InferenceProfile:
+    def __init__(self, name="fp32", intra_threads=None, interop_threads=None, max_input_tokens=512):
+        if name not in PROFILES:
+            raise ValueError(f"Unknown inference profile '{name}'; expected one of {PROFILES}")
+        self.name = name
+        self.intra_threads = intra_threads
+        self.interop_threads = interop_threads
+        self.max_input_tokens = max_input_tokens
+
+    @classmethod
+    def from_env(cls):
+        def env_int(name):
+            value = os.environ.get(name)
+            return int(value) if value else None
+        return cls(
+            name=os.environ.get("PERSONA_INFERENCE_PROFILE", "fp32"),
+            intra_threads=env_int("PERSONA_TORCH_THREADS"),
+            interop_threads=env_int("PERSONA_TORCH_INTEROP_THREADS"),
+            max_input_tokens=env_int("PERSONA_MAX_INPUT_TOKENS") or 512,
+        )
+
+    @property
+    def model_id_suffix(self):
+        """Distinguishes cached results produced under different precision/truncation."""
+        return f"{self.name}/max{self.max_input_tokens}"
+
+def configure_torch_threads(profile):
+    """Applies the per-worker thread counts. Inter-op threads can only be set before torch starts work."""
+    import torch
+
+    if profile.intra_threads:
+        torch.set_num_threads(profile.intra_threads)
+    if profile.interop_threads:
+        try:
+            torch.set_num_interop_threads(profile.interop_threads)
+        except RuntimeError:
+            pass  # already initialized in this process; keep the existing pool
+
+def configure_worker_threads(workers, profile=None):
+    """
+    Sizes torch's intra-op pool for one of `workers` pre-forked processes sharing this host:
+    PERSONA_TORCH_THREADS if set, otherwise an even share of the cores. Returns the count,
+    or None when torch is not loaded in this process (e.g. stub models).
+    """
+    if "torch" not in sys.modules:
+        return None
+    profile = profile or InferenceProfile.from_env()
+    threads = profile.intra_threads or max(1, (os.cpu_count() or 1) // max(1, workers))
+    configure_torch_threads(InferenceProfile(profile.name, threads, profile.interop_threads,
+                                             profile.max_input_tokens))
+    return threads
+
+class CPUSummarizer:
+    def __init__(self, model_name, profile):
+        import torch
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+        configure_torch_threads(profile)
+        self.profile = profile
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        model.eval()
+        if profile.name == "int8":
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self._torch = torch
+
+    def __call__(self, texts, max_length=32, min_length=10, do_sample=False, batch_size=None, **kwargs):
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        inputs = self.tokenizer(batch, truncation=True, max_length=self.profile.max_input_tokens,
+                                padding=True, return_tensors="pt")
+        with self._torch.inference_mode():
+            output_ids = self.model.generate(**inputs, max_length=max_length, min_length=min_length,
+                                             do_sample=do_sample, **kwargs)
+        summaries = self.tokenizer.batch_decode(output_ids, skip_special_tokens=True,
+                                                clean_up_tokenization_spaces=True)
+        return [{"summary_text": s.strip()} for s in summaries]
+
+def load_summarizer(model_name, profile=None):
+    return CPUSummarizer(model_name, profile or InferenceProfile.from_env())
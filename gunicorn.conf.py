@@ -0,0 +1,43 @@
+"""
+gunicorn settings for persona-net; every value can be overridden on the command line.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app (and with it spaCy and the summarizer) is loaded once in the master and shared
+by the forked workers. Each worker then sizes its torch thread pool to its share of the
+cores, runs a warm-up pitch and only then starts accepting requests; GET /readyz reports
+whether a worker's models and database connection are up.
+"""
+import os
+
+bind = os.environ.get("PERSONA_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("PERSONA_WORKERS", 4))
+worker_class = "gthread"
+threads = int(os.environ.get("PERSONA_WORKER_THREADS", 4))
+preload_app = True
+timeout = 120
+graceful_timeout = 30
+accesslog = "-"
+errorlog = "-"
+
+def post_fork(server, worker):
+    # Engines, the Interaction writer, the analysis cache and the batchers reset their
+    # connections and threads through os.register_at_fork; only the thread share is left.
+    from cpu_inference import configure_worker_threads
+
+    threads = configure_worker_threads(server.cfg.workers)
+    if threads:
+        server.log.info("worker %s: %s torch threads", worker.pid, threads)
+
+def post_worker_init(worker):
+    if os.environ.get("PERSONA_WARMUP", "1") != "1":
+        return
+    import wsgi
+
+    wsgi.warmup_worker()
+    worker.log.info("worker %s warmed up", worker.pid)
+
+def when_ready(server):
+    from model_registry import registry
+
+    server.log.info("models preloaded: %s", registry.status())
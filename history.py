@@ -0,0 +1,89 @@
+"""
+Read paths over journalists and interactions.
+
+Every listing is keyset-paginated: a page is fetched with `WHERE id > after` (or
+`id < before`) plus LIMIT, so a page costs the same however deep into the table it is.
+Callers pass the returned cursor back to get the next page; it is None on the last one.
+Per-journalist aggregates are computed in SQL with GROUP BY over the
+(journalist_id, created_at) index rather than by loading Interaction rows.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+
+from models import Interaction, Journalist
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def _limit(limit):
+    return max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+def journalist_page(session, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Journalists in id order. Returns (journalists, next_after)."""
+    limit = _limit(limit)
+    query = select(Journalist)
+    if after is not None:
+        query = query.where(Journalist.id > after)
+    rows = session.execute(query.order_by(Journalist.id).limit(limit + 1)).scalars().all()
+    page = rows[:limit]
+    return page, (page[-1].id if len(rows) > limit else None)
+
+def journalist_stats(session, journalist_ids):
+    """{journalist_id: {'interactions': n, 'last_contact': datetime}} for the given journalists."""
+    if not journalist_ids:
+        return {}
+    rows = session.execute(
+        select(Interaction.journalist_id, func.count(Interaction.id), func.max(Interaction.created_at))
+        .where(Interaction.journalist_id.in_(list(journalist_ids)))
+        .group_by(Interaction.journalist_id)
+    )
+    stats = {jid: {'interactions': 0, 'last_contact': None} for jid in journalist_ids}
+    for jid, count, last_contact in rows:
+        stats[jid] = {'interactions': count, 'last_contact': last_contact}
+    return stats
+
+def interaction_page(session, journalist_id=None, since=None, until=None, before=None,
+                     limit=DEFAULT_PAGE_SIZE):
+    """
+    Interactions newest first, optionally for one journalist and within
+    [since, until) on created_at. Returns (interactions, next_before).
+    """
+    limit = _limit(limit)
+    query = select(Interaction).options(selectinload(Interaction.stored_pitch))
+    if journalist_id is not None:
+        query = query.where(Interaction.journalist_id == journalist_id)
+    if since is not None:
+        query = query.where(Interaction.created_at >= since)
+    if until is not None:
+        query = query.where(Interaction.created_at < until)
+    if before is not None:
+        query = query.where(Interaction.id < before)
+    rows = session.execute(query.order_by(Interaction.id.desc()).limit(limit + 1)).scalars().all()
+    page = rows[:limit]
+    return page, (page[-1].id if len(rows) > limit else None)
+
+def journalist_to_dict(journalist, stats=None):
+    data = {
+        'id': journalist.id,
+        'name': journalist.name,
+        'interests': journalist.interests,
+        'style': journalist.style,
+    }
+    if stats is not None:
+        data['interactions'] = stats['interactions']
+        data['last_contact'] = _isoformat(stats['last_contact'])
+    return data
+
+def interaction_to_dict(interaction):
+    return {
+        'id': interaction.id,
+        'journalist_id': interaction.journalist_id,
+        'conversation_id': interaction.conversation_id,
+        'turn': interaction.turn,
+        'pitch': interaction.pitch_text,
+        'response': interaction.response,
+        'created_at': _isoformat(interaction.created_at),
+    }
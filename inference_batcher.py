@@ -0,0 +1,140 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class MicroBatcher:
+    """
+    Collects single-item requests from concurrent callers into batches.
+
+    A background thread takes the first pending item, then keeps collecting until
+    `max_batch_size` items are queued or `max_wait` seconds have passed since that
+    first item, and calls `batch_fn(items)` once. `batch_fn` must return one result
+    per item, in order; each caller gets its own result (or the batch's exception)
+    back through a Future.
+    """
+    def __init__(self, batch_fn, max_batch_size=8, max_wait=0.01, name="batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self.stats = {"batches": 0, "items": 0, "max_batch": 0}
+        self._queue = queue.Queue()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        if self._stopped:
+            raise RuntimeError(f"{self.name} is stopped")
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    def stop(self):
+        self._stopped = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                self._queue.put(None)  # re-deliver the stop marker after this batch
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: got {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.stats["batches"] += 1
+            self.stats["items"] += len(items)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(items))
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+# --- Batch functions for the persona models ------------------------------------------
+
+def summarize_batch(texts, max_length=32, min_length=10):
+    """One batched distilbart forward pass; falls back per item if the batch fails."""
+    from ai_persona import summarize
+    from model_registry import get_summarizer
+
+    summarizer = get_summarizer()
+    try:
+        outputs = summarizer(list(texts), max_length=max_length, min_length=min_length,
+                             do_sample=False, batch_size=len(texts))
+        return [o['summary_text'] for o in outputs]
+    except Exception:
+        import metrics
+        metrics.ERRORS.inc("summarizer_batch")
+        return [summarize(t) for t in texts]
+
+def nlp_batch(texts):
+    from model_registry import get_nlp
+
+    return list(get_nlp().pipe(texts, batch_size=len(texts)))
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+_settings = {}
+
+def enable(max_batch_size=8, max_wait=0.01):
+    """Routes ai_persona's summarizer and spaCy calls through shared micro-batchers."""
+    with _batchers_lock:
+        disable()
+        _settings.update(max_batch_size=max_batch_size, max_wait=max_wait)
+        _batchers["summarizer"] = MicroBatcher(summarize_batch, max_batch_size, max_wait, "summarizer-batcher")
+        _batchers["nlp"] = MicroBatcher(nlp_batch, max_batch_size, max_wait, "nlp-batcher")
+
+def disable():
+    while _batchers:
+        _batchers.popitem()[1].stop()
+
+def _after_fork_in_child():
+    # Batcher threads do not survive fork; start fresh ones in the child
+    global _batchers_lock
+    _batchers_lock = threading.Lock()
+    if _batchers:
+        _batchers.clear()
+        enable(**_settings)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def get_batcher(name):
+    """Returns the active batcher for `name`, or None when batching is off."""
+    return _batchers.get(name)
+
+if os.environ.get("PERSONA_BATCHING") == "1":
+    enable(
+        max_batch_size=int(os.environ.get("PERSONA_BATCH_SIZE", 8)),
+        max_wait=float(os.environ.get("PERSONA_BATCH_WAIT_MS", 10)) / 1000,
+    )
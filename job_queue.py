@@ -0,0 +1,188 @@
+"""
+SQLite-backed job queue for persona queries.
+
+The web tier calls submit_job() and returns immediately; a pool of worker processes
+(`python job_queue.py --workers 4`) claims queued jobs from the persona_jobs table,
+runs the NLP with models already loaded, and writes Interaction rows plus the job
+result in one transaction. No external broker is needed.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update, select
+from sqlalchemy.orm import sessionmaker
+
+from models import Journalist, Interaction, PersonaJob
+from storage import DATABASE_URL, make_engine, migrate, pitch_ids
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+MAX_ATTEMPTS = 3
+
+def submit_job(session, pitch, journalist_ids):
+    """Queues a persona query and returns its job ID. The caller commits."""
+    job = PersonaJob(
+        id=uuid.uuid4().hex,
+        status=QUEUED,
+        pitch=pitch,
+        journalist_ids=json.dumps([int(j) for j in journalist_ids]),
+        attempts=0,
+        created_at=datetime.utcnow(),
+    )
+    session.add(job)
+    return job.id
+
+def job_status(session, job_id):
+    """Returns the job as a JSON-ready dict, or None if it does not exist."""
+    job = session.get(PersonaJob, job_id)
+    if job is None:
+        return None
+    status = {
+        'job_id': job.id,
+        'status': job.status,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == DONE:
+        status['responses'] = json.loads(job.result or '[]')
+    elif job.status == FAILED:
+        status['error'] = job.error
+    return status
+
+def claim_next_job(session, worker_id):
+    """
+    Atomically moves the oldest queued job to 'running' for this worker.
+    The conditional UPDATE is the lock: if another worker won the race, rowcount is 0.
+    """
+    while True:
+        job_id = session.execute(
+            select(PersonaJob.id).where(PersonaJob.status == QUEUED)
+            .order_by(PersonaJob.created_at).limit(1)
+        ).scalar()
+        if job_id is None:
+            return None
+        claimed = session.execute(
+            update(PersonaJob)
+            .where(PersonaJob.id == job_id, PersonaJob.status == QUEUED)
+            .values(status=RUNNING, worker=worker_id, started_at=datetime.utcnow(),
+                    attempts=PersonaJob.attempts + 1)
+        ).rowcount
+        session.commit()
+        if claimed:
+            return session.get(PersonaJob, job_id)
+
+def requeue_stale_jobs(session, timeout=600):
+    """Puts jobs whose worker died mid-run back on the queue (or fails them after MAX_ATTEMPTS)."""
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    stale = (PersonaJob.status == RUNNING, PersonaJob.started_at < cutoff)
+    session.execute(
+        update(PersonaJob).where(*stale, PersonaJob.attempts >= MAX_ATTEMPTS)
+        .values(status=FAILED, error='worker timed out', finished_at=datetime.utcnow())
+    )
+    session.execute(
+        update(PersonaJob).where(*stale).values(status=QUEUED, worker=None)
+    )
+    session.commit()
+
+def run_job(session, job):
+    """Runs one claimed job: analyze the pitch once, render per journalist, persist."""
+    from ai_persona import analyze_pitch, analysis_record, render_response
+
+    try:
+        analysis = None
+        responses = []
+        for jid in json.loads(job.journalist_ids):
+            journalist = session.get(Journalist, int(jid))
+            if journalist:
+                if analysis is None:
+                    analysis = analyze_pitch(job.pitch)
+                    pitch_id = pitch_ids(session.connection(), [job.pitch],
+                                         {job.pitch: analysis_record(analysis)})[job.pitch]
+                resp = render_response(journalist, analysis)
+                session.add(Interaction(journalist_id=journalist.id, pitch_id=pitch_id, response=resp,
+                                        created_at=datetime.utcnow()))
+                responses.append({'name': journalist.name, 'response': resp})
+        job.result = json.dumps(responses)
+        job.status = DONE
+    except Exception as e:
+        session.rollback()
+        job = session.get(PersonaJob, job.id)
+        job.status = FAILED
+        job.error = f"{type(e).__name__}: {e}"
+    job.finished_at = datetime.utcnow()
+    session.commit()
+    return job.status
+
+def worker_loop(database_url=DATABASE_URL, poll_interval=0.5, stop_after_idle=None, workers=1):
+    """
+    Claims and runs jobs until SIGTERM (or until idle for stop_after_idle seconds).
+    `workers` is the size of the pool this loop belongs to; it sets the torch thread share.
+    """
+    from cpu_inference import configure_worker_threads
+    from model_registry import warmup
+
+    # Each process gets its own engine; connections must never cross a fork.
+    engine = make_engine(database_url, pool_size=1, max_overflow=0)
+    Session = sessionmaker(engine, future=True)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    warmup()  # no-op when run_pool preloaded the models before forking
+    configure_worker_threads(workers)
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    idle_since = time.monotonic()
+    while not stopping:
+        with Session() as session:
+            job = claim_next_job(session, worker_id)
+            if job is not None:
+                run_job(session, job)
+                idle_since = time.monotonic()
+                continue
+        if stop_after_idle is not None and time.monotonic() - idle_since > stop_after_idle:
+            break
+        time.sleep(poll_interval)
+    engine.dispose()
+
+def run_pool(workers, database_url=DATABASE_URL, poll_interval=0.5, stale_timeout=600):
+    engine = make_engine(database_url)
+    migrate(engine)
+    with sessionmaker(engine, future=True)() as session:
+        requeue_stale_jobs(session, stale_timeout)
+    engine.dispose()
+
+    if multiprocessing.get_start_method() == 'fork':
+        # Load the models once here so forked workers share the weights copy-on-write
+        from model_registry import preload_for_fork
+        preload_for_fork()
+
+    procs = [
+        multiprocessing.Process(target=worker_loop, args=(database_url, poll_interval, None, workers), daemon=True)
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    print(f"Started {workers} persona workers on {database_url}")
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run persona query workers.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    parser.add_argument('--stale-timeout', type=int, default=600,
+                        help="seconds after which a running job is assumed orphaned")
+    args = parser.parse_args()
+    run_pool(args.workers, args.database_url, args.poll_interval, args.stale_timeout)
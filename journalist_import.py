@@ -0,0 +1,198 @@
+"""
+Bulk journalist import from CSV or JSONL media lists.
+
+    python journalist_import.py media_list.csv
+    python journalist_import.py export.jsonl --chunk-size 10000 --database-url sqlite:///pr_platform.db
+
+Each row needs external_id, name, interests and style; sample_articles is optional.
+`interests` may be a comma-separated string or, in JSONL, a list. The file is read as a
+stream and written in chunks, each one executemany upsert keyed on external_id in its
+own transaction, so memory stays flat and existing journalists keep their IDs (and with
+them their Interaction history). Invalid rows are reported and skipped (--strict aborts).
+The /match_journalists TF-IDF index is then rebuilt, so new and changed journalists
+are scored with fresh IDF weights and running workers reload it, unless --no-index is
+given.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import Journalist
+from storage import DATABASE_URL, make_engine, migrate
+
+FIELDS = ('external_id', 'name', 'interests', 'style', 'sample_articles')
+REQUIRED = ('external_id', 'name', 'interests', 'style')
+MAX_EXTERNAL_ID = 128
+CHUNK_SIZE = 5000
+
+class InvalidRow(ValueError):
+    pass
+
+def read_rows(path, fmt=None):
+    """
+    Yields (raw row, error) pairs from a CSV (header row required) or JSONL file; `fmt`
+    defaults to 'jsonl' for .jsonl/.ndjson paths and 'csv' otherwise. A parsed row comes
+    as (dict, None); a JSONL line that is not valid JSON comes as (None, "line N: ...").
+    Blank JSONL lines are skipped.
+    """
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                yield row, None
+        else:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line), None
+                    except json.JSONDecodeError as e:
+                        yield None, f"line {line_no}: invalid JSON ({e.msg})"
+
+def validate(raw):
+    """Returns a clean row dict with exactly FIELDS, or raises InvalidRow."""
+    if not isinstance(raw, dict):
+        raise InvalidRow("not an object")
+    row = {}
+    for field in FIELDS:
+        value = raw.get(field)
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(v).strip() for v in value if str(v).strip())
+        value = str(value).strip() if value is not None else ''
+        if field in REQUIRED and not value:
+            raise InvalidRow(f"missing {field}")
+        row[field] = value or None
+    if len(row['external_id']) > MAX_EXTERNAL_ID:
+        raise InvalidRow(f"external_id longer than {MAX_EXTERNAL_ID} characters")
+    return row
+
+def _upsert_statement(dialect_name):
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(dialect_name)
+    if dialect is None:
+        return None
+    stmt = dialect.insert(Journalist)
+    return stmt.on_conflict_do_update(
+        index_elements=['external_id'],
+        set_={f: stmt.excluded[f] for f in FIELDS if f != 'external_id'},
+    )
+
+def upsert_chunk(conn, rows, adopt_by_name=False):
+    """
+    Upserts one chunk (deduplicated by external_id, last row wins) and returns
+    (inserted, updated). With adopt_by_name, a new external_id is first attached to an
+    existing journalist of the same name that has none yet, so lists seeded before
+    external_id existed are updated in place instead of duplicated.
+    """
+    rows = list({row['external_id']: row for row in rows}.values())
+    ids = [row['external_id'] for row in rows]
+    existing = set(conn.execute(
+        select(Journalist.external_id).where(Journalist.external_id.in_(ids))).scalars())
+
+    if adopt_by_name:
+        unclaimed = [{'b_name': r['name'], 'b_external_id': r['external_id']}
+                     for r in rows if r['external_id'] not in existing]
+        if unclaimed:
+            first_unclaimed = (select(Journalist.id)
+                               .where(Journalist.external_id.is_(None), Journalist.name == bindparam('b_name'))
+                               .order_by(Journalist.id).limit(1).scalar_subquery())
+            conn.execute(
+                update(Journalist).where(Journalist.id == first_unclaimed)
+                .values(external_id=bindparam('b_external_id')).execution_options(synchronize_session=False),
+                unclaimed)
+            existing = set(conn.execute(
+                select(Journalist.external_id).where(Journalist.external_id.in_(ids))).scalars())
+
+    stmt = _upsert_statement(conn.dialect.name)
+    if stmt is not None:
+        conn.execute(stmt, rows)
+    else:
+        # No native upsert: update the known keys, insert the rest
+        fresh = [r for r in rows if r['external_id'] not in existing]
+        known = [{f'b_{k}': v for k, v in r.items()} for r in rows if r['external_id'] in existing]
+        if known:
+            conn.execute(
+                update(Journalist).where(Journalist.external_id == bindparam('b_external_id'))
+                .values({f: bindparam(f'b_{f}') for f in FIELDS if f != 'external_id'})
+                .execution_options(synchronize_session=False),
+                known)
+        if fresh:
+            conn.execute(Journalist.__table__.insert(), fresh)
+    return len(rows) - len(existing), len(existing)
+
+def import_journalists(engine, rows, chunk_size=CHUNK_SIZE, strict=False, adopt_by_name=False,
+                       log=sys.stderr):
+    """
+    Validates and upserts an iterable of raw row dicts (or (raw, error) pairs from
+    read_rows). Returns a report dict with counts, elapsed seconds and rows/sec.
+    """
+    report = {'read': 0, 'inserted': 0, 'updated': 0, 'invalid': 0}
+    started = time.perf_counter()
+    chunk = []
+
+    def flush():
+        with engine.begin() as conn:
+            inserted, updated = upsert_chunk(conn, chunk, adopt_by_name)
+        report['inserted'] += inserted
+        report['updated'] += updated
+        chunk.clear()
+        elapsed = time.perf_counter() - started
+        print(f"{report['read']} rows read, {report['read'] / elapsed:.0f} rows/s", file=log)
+
+    for item in rows:
+        raw, error = item if isinstance(item, tuple) else (item, None)
+        report['read'] += 1
+        try:
+            if error:
+                raise InvalidRow(error)
+            chunk.append(validate(raw))
+        except InvalidRow as e:
+            report['invalid'] += 1
+            message = f"row {report['read']}: {e}"
+            if strict:
+                raise InvalidRow(message) from None
+            if report['invalid'] <= 20:
+                print(f"Skipping {message}", file=log)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    report['rows_per_second'] = round(report['read'] / report['seconds']) if report['seconds'] else None
+    return report
+
+def rebuild_index(engine):
+    import journalist_index
+    from sqlalchemy.orm import sessionmaker
+
+    with sessionmaker(engine, future=True)() as session:
+        index = journalist_index.JournalistIndex().build(session.query(Journalist).all())
+    index.save(journalist_index.INDEX_DIR)
+    return len(index)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="default: from the file extension")
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--strict', action='store_true', help="abort on the first invalid row")
+    parser.add_argument('--adopt-by-name', action='store_true',
+                        help="attach new external_ids to existing journalists of the same name that have none")
+    parser.add_argument('--no-index', action='store_true', help="don't rebuild the TF-IDF index")
+    args = parser.parse_args()
+
+    engine = make_engine(args.database_url)
+    migrate(engine)
+    try:
+        report = import_journalists(engine, read_rows(args.path, args.format), args.chunk_size,
+                                    args.strict, args.adopt_by_name)
+    except InvalidRow as e:
+        sys.exit(f"Error: {e}")
+    if (report['inserted'] or report['updated']) and not args.no_index:
+        report['indexed'] = rebuild_index(engine)
+    print(json.dumps(report))
@@ -0,0 +1,292 @@
+"""
+TF-IDF vector index for ranking journalists against a pitch.
+
+Each journalist's interests, style and sample_articles are turned into a TF-IDF vector
+over the unigrams and bigrams seen when the index was built (one column per term, with
+its IDF weight), L2-normalized, so a pitch scores each journalist by exact cosine
+similarity. The matrix is stored sparse and term-major (for each term, the rows that
+contain it and their weights), so ranking a pitch only touches the postings of its own
+terms, then argpartition picks the top k.
+
+The vocabulary and IDF weights are fixed when the index is built. Journalists added
+afterwards are vectorized with them (terms the index has not seen are ignored) and kept
+in memory; rebuild periodically to pick up new terms and refresh IDF. The index
+persists to a directory of .npy files plus the term list, which load memory-mapped so
+every worker on a host shares one copy of the matrix.
+"""
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+INDEX_DIR = os.environ.get('PERSONA_JOURNALIST_INDEX', 'journalist_index')
+INDEX_FORMAT = 2
+ARRAYS = ("indptr", "rows", "weights", "idf", "ids")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have how i in is it its of on or our that the
+this to was we what with you your will can just new about into more their they
+""".split())
+
+_token_re = re.compile(r"[a-z0-9][a-z0-9+#\-]*")
+
+def tokenize(text):
+    words = [w for w in _token_re.findall((text or "").lower()) if w not in STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def journalist_text(journalist):
+    return " . ".join(filter(None, [journalist.interests, journalist.style, journalist.sample_articles]))
+
+def term_counts(text):
+    """Sublinear term frequencies of `text`: {term: 1 + log(count)}."""
+    counts = {}
+    for tok in tokenize(text):
+        counts[tok] = counts.get(tok, 0) + 1
+    return {term: 1.0 + math.log(n) for term, n in counts.items()}
+
+class IndexNotBuilt(LookupError):
+    """No saved index to serve from; run `python journalist_index.py`."""
+
+class JournalistIndex:
+    def __init__(self):
+        self.terms = {}                                # term -> column
+        self.idf = np.zeros(0, dtype=np.float32)       # per column
+        self.ids = np.zeros(0, dtype=np.int64)         # per row
+        # Term-major sparse matrix: column c holds rows[indptr[c]:indptr[c + 1]] with those weights
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.rows = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self._dead = None                              # rows replaced or removed since the build
+        self._pending = {}                             # journalist_id -> {column: weight}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        dead = int(self._dead.sum()) if self._dead is not None else 0
+        return len(self.ids) - dead + len(self._pending)
+
+    def _vectorize(self, text):
+        """{column: weight} for `text`, L2-normalized; terms outside the vocabulary are dropped."""
+        vec = {self.terms[t]: tf * float(self.idf[self.terms[t]])
+               for t, tf in term_counts(text).items() if t in self.terms}
+        norm = math.sqrt(sum(w * w for w in vec.values()))
+        return {c: w / norm for c, w in vec.items()} if norm else {}
+
+    def build(self, journalists):
+        """Rebuilds the vocabulary, IDF weights and matrix from scratch."""
+        journalists = list(journalists)
+        terms, rows, cols, tfs = {}, [], [], []
+        for i, j in enumerate(journalists):
+            for term, tf in term_counts(journalist_text(j)).items():
+                rows.append(i)
+                cols.append(terms.setdefault(term, len(terms)))
+                tfs.append(tf)
+        rows = np.array(rows, dtype=np.int32)
+        cols = np.array(cols, dtype=np.int64)
+        df = np.bincount(cols, minlength=len(terms))
+        idf = (np.log((1 + len(journalists)) / (1 + df)) + 1).astype(np.float32)
+        weights = np.array(tfs, dtype=np.float32) * idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(journalists)))
+        weights /= norms[rows].astype(np.float32)
+        order = np.argsort(cols, kind="stable")
+        with self._lock:
+            self.terms, self.idf = terms, idf
+            self.ids = np.array([j.id for j in journalists], dtype=np.int64)
+            self.indptr = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+            self.rows, self.weights = rows[order], weights[order]
+            self._dead, self._pending = None, {}
+        return self
+
+    def add(self, journalists):
+        """Adds (or replaces) journalists using the current vocabulary and IDF weights."""
+        journalists = list(journalists)
+        vectors = [(j.id, self._vectorize(journalist_text(j))) for j in journalists]
+        with self._lock:
+            self._drop([j.id for j in journalists])
+            self._pending.update(vectors)
+
+    def remove(self, journalist_id):
+        with self._lock:
+            self._drop([journalist_id])
+
+    def _drop(self, journalist_ids):
+        if len(self.ids):
+            hit = np.isin(self.ids, journalist_ids)
+            if hit.any():
+                # Rows are masked rather than cut out, so a drop never rewrites the matrix
+                self._dead = hit if self._dead is None else self._dead | hit
+        for jid in journalist_ids:
+            self._pending.pop(jid, None)
+
+    def _compact(self):
+        """Folds pending rows into the matrix and discards dead ones (one copy of the matrix)."""
+        if self._dead is None and not self._pending:
+            return
+        cols = np.repeat(np.arange(len(self.terms), dtype=np.int64), np.diff(self.indptr))
+        rows, weights, ids = np.asarray(self.rows), np.asarray(self.weights), self.ids
+        if self._dead is not None:
+            alive = ~self._dead[rows]
+            renumber = np.cumsum(~self._dead) - 1
+            rows, cols, weights = renumber[rows[alive]].astype(np.int32), cols[alive], weights[alive]
+            ids = ids[~self._dead]
+        if self._pending:
+            extra = [(len(ids) + n, c, w) for n, vec in enumerate(self._pending.values()) for c, w in vec.items()]
+            if extra:
+                r, c, w = zip(*extra)
+                rows = np.concatenate([rows, np.array(r, dtype=np.int32)])
+                cols = np.concatenate([cols, np.array(c, dtype=np.int64)])
+                weights = np.concatenate([weights, np.array(w, dtype=np.float32)])
+            ids = np.concatenate([ids, np.array(list(self._pending), dtype=np.int64)])
+        order = np.argsort(cols, kind="stable")
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(cols, minlength=len(self.terms)))]).astype(np.int64)
+        self.rows, self.weights, self.ids = rows[order], weights[order], ids
+        self._dead, self._pending = None, {}
+
+    def max_id(self):
+        with self._lock:
+            ids = [int(self.ids.max())] if len(self.ids) else []
+            return max(ids + list(self._pending), default=0)
+
+    def search(self, text, k=10):
+        """Returns [(journalist_id, cosine score)] for the top-k matching journalists, best first."""
+        with self._lock:
+            query = self._vectorize(text)
+            ids, indptr, rows, weights = self.ids, self.indptr, self.rows, self.weights
+            dead, pending = self._dead, list(self._pending.items())
+        if not query:
+            return []
+        cols = list(query)
+        spans = [(indptr[c], indptr[c + 1]) for c in cols]
+        hit_rows = np.concatenate([rows[a:b] for a, b in spans])
+        hit_weights = np.concatenate([weights[a:b] * np.float32(query[c]) for c, (a, b) in zip(cols, spans)])
+        scores = np.bincount(hit_rows, weights=hit_weights, minlength=len(ids))
+        if dead is not None:
+            scores[dead] = 0.0
+        if pending:
+            # Recently added journalists are scored from their own vectors, so an add never touches the matrix
+            ids = np.concatenate([ids, np.array([jid for jid, _ in pending], dtype=np.int64)])
+            scores = np.concatenate([scores, [sum(w * vec.get(c, 0.0) for c, w in query.items())
+                                              for _, vec in pending]])
+        if not len(ids):
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(ids[i]), float(scores[i])) for i in top if scores[i] > 0]
+
+    def save(self, path=INDEX_DIR):
+        with self._lock:
+            self._compact()
+            os.makedirs(path, exist_ok=True)
+            # Write to unique temp files and rename, so concurrent saves never share a file and
+            # a load never sees a half-written one; meta.json goes last and load() checks the counts.
+            temps = []
+            try:
+                for name in ARRAYS:
+                    fd, tmp = tempfile.mkstemp(dir=path, prefix=f".{name}.npy.")
+                    temps.append((tmp, f"{name}.npy"))
+                    with os.fdopen(fd, "wb") as f:
+                        np.save(f, np.ascontiguousarray(getattr(self, name)))
+                fd, tmp = tempfile.mkstemp(dir=path, prefix=".terms.json.")
+                temps.append((tmp, "terms.json"))
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(sorted(self.terms, key=self.terms.get), f)
+                fd, tmp = tempfile.mkstemp(dir=path, prefix=".meta.json.")
+                temps.append((tmp, "meta.json"))
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"format": INDEX_FORMAT, "count": int(len(self.ids)),
+                               "terms": len(self.terms), "nnz": int(len(self.rows))}, f)
+                for tmp, name in temps:
+                    os.replace(tmp, os.path.join(path, name))
+            finally:
+                for tmp, _ in temps:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+
+    @classmethod
+    def load(cls, path=INDEX_DIR, mmap=True):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != INDEX_FORMAT:
+            raise ValueError(f"index in {path} is from an older version; rebuild it with python journalist_index.py")
+        index = cls()
+        for name in ARRAYS:
+            setattr(index, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None))
+        with open(os.path.join(path, "terms.json"), encoding="utf-8") as f:
+            index.terms = {term: col for col, term in enumerate(json.load(f))}
+        if not (len(index.ids) == meta["count"] and len(index.terms) == len(index.idf) == meta["terms"]
+                and len(index.indptr) == meta["terms"] + 1
+                and index.indptr[-1] == len(index.rows) == len(index.weights) == meta["nnz"]):
+            raise ValueError(f"index files in {path} are from different saves")
+        return index
+
+# --- Process-wide index used by the /match_journalists route -------------------------
+
+RELOAD_CHECK_INTERVAL = 1.0  # seconds between checks for a rebuilt index on disk
+
+_index = None
+_index_version = None  # identity of the meta.json the shared index was loaded from
+_checked_at = None
+_index_lock = threading.Lock()
+
+def _disk_version(path):
+    # save() renames meta.json into place last, so a rebuild always changes its inode/mtime
+    try:
+        st = os.stat(os.path.join(path, "meta.json"))
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
+def get_index(session, path=INDEX_DIR):
+    """
+    Returns the shared index, loading it from disk on first use, then appending any
+    journalists added since it was last saved. Appended rows live in memory only: the
+    index is built and written solely by the rebuild command (python journalist_index.py,
+    or journalist_import.py after an import), never on the request path, so workers
+    neither pay for a build nor race each other writing the files. Every
+    RELOAD_CHECK_INTERVAL seconds the files are checked, and a rebuilt index replaces
+    the in-memory one. Raises IndexNotBuilt while there is no index to load.
+    """
+    global _index, _index_version, _checked_at
+    from models import Journalist
+
+    with _index_lock:
+        now = time.monotonic()
+        if _index is None or now - _checked_at >= RELOAD_CHECK_INTERVAL:
+            _checked_at = now
+            version = _disk_version(path)
+            if _index is None or (version is not None and version != _index_version):
+                try:
+                    _index, _index_version = JournalistIndex.load(path), version
+                except (FileNotFoundError, ValueError, KeyError) as e:
+                    # Missing, or caught mid-save: keep what we have and look again later
+                    if _index is None:
+                        raise IndexNotBuilt(f"no journalist index in {path} ({e}); "
+                                            "run `python journalist_index.py`") from None
+        newer = session.query(Journalist).filter(Journalist.id > _index.max_id()).all()
+        if newer:
+            _index.add(newer)
+    return _index
+
+def reset_index():
+    global _index, _index_version
+    with _index_lock:
+        _index = _index_version = None
+
+if __name__ == "__main__":
+    import argparse
+    from sqlalchemy.orm import sessionmaker
+    from models import Journalist
+    from storage import make_engine
+
+    parser = argparse.ArgumentParser(description="Rebuild the journalist TF-IDF index from the database.")
+    parser.add_argument("--path", default=INDEX_DIR)
+    args = parser.parse_args()
+    with sessionmaker(make_engine(), future=True)() as session:
+        index = JournalistIndex().build(session.query(Journalist).all())
+    index.save(args.path)
+    print(f"Indexed {len(index)} journalists into {args.path}")
@@ -0,0 +1,148 @@
+"""
+In-process metrics with Prometheus text exposition, cheap enough for the request hot path.
+
+Recording is a dict lookup, a bisect over fixed bucket bounds and a few additions under
+a lock, so it stays on in production. Values are per process; with several gunicorn
+workers each one serves its own /metrics. Use a scraper that treats them as separate
+targets, or sum over instances.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond template rendering through multi-second summarization
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values)) + "}"
+
+class _Metric:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def expose(self):
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_label_str(self.labels, key)} {value}"
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, *label_values, value):
+        with self._lock:
+            self._values[label_values] = value
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *label_values, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def expose(self):
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_label_str(self.labels + ('le',), key + (le,))} {cumulative}"
+            yield f"{self.name}_sum{_label_str(self.labels, key)} {total}"
+            yield f"{self.name}_count{_label_str(self.labels, key)} {count}"
+
+_registry = []
+_collectors = []
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+def counter(name, help, labels=()):
+    return _register(Counter(name, help, labels))
+
+def gauge(name, help, labels=()):
+    return _register(Gauge(name, help, labels))
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, help, labels, buckets))
+
+def add_collector(fn):
+    """Registers fn(), called at scrape time to refresh gauges from other components."""
+    _collectors.append(fn)
+    return fn
+
+STAGE_SECONDS = histogram("persona_stage_seconds", "Time spent per processing stage.", ["stage"])
+CACHE_LOOKUPS = counter("persona_analysis_cache_lookups_total", "Pitch analysis cache lookups.", ["result"])
+ERRORS = counter("persona_errors_total", "Errors by stage.", ["stage"])
+MODEL_LOAD_SECONDS = gauge("persona_model_load_seconds", "Wall time taken to load each model.", ["model"])
+REQUEST_SECONDS = histogram("persona_http_request_seconds", "HTTP request latency.", ["endpoint", "method"])
+REQUESTS = counter("persona_http_requests_total", "HTTP requests by status.", ["endpoint", "method", "status"])
+
+def _request_timings():
+    """Per-request {stage: seconds} when called inside a Flask request, else None."""
+    try:
+        from flask import g, has_request_context
+    except ImportError:
+        return None
+    if not has_request_context():
+        return None
+    timings = g.get("stage_timings")
+    if timings is None:
+        timings = g.stage_timings = {}
+    return timings
+
+def record_stage(stage, seconds):
+    STAGE_SECONDS.observe(stage, value=seconds)
+    timings = _request_timings()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+@contextmanager
+def stage(name):
+    """Times the enclosed block into persona_stage_seconds{stage=name} and the request breakdown."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+def server_timing_header(timings):
+    """Formats {stage: seconds} as a Server-Timing header value (durations in ms)."""
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items())
+
+def render():
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    for collect in _collectors:
+        try:
+            collect()
+        except Exception:
+            ERRORS.inc("metrics_collector")
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        with metric._lock:
+            lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,165 @@
+import gc
+import os
+import re
+import threading
+import time
+
+from cpu_inference import InferenceProfile
+
+SPACY_MODEL = os.environ.get("PERSONA_SPACY_MODEL", "en_core_web_sm")
+SUMMARIZER_MODEL = os.environ.get("PERSONA_SUMMARIZER_MODEL", "sshleifer/distilbart-cnn-12-6")
+INFERENCE_PROFILE = InferenceProfile.from_env()
+
+class ModelRegistry:
+    """
+    Loads NLP models on first use instead of at import time.
+
+    Each model is registered with a zero-argument loader. The first call to get()
+    runs the loader under a per-model lock, so concurrent first requests load the
+    model once. Tests and light tools can swap in stub backends with set().
+    """
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._model_ids = {}
+        self._loader_ids = {}
+        self.load_seconds = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name, loader, model_id=None):
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._loader_ids[name] = self._model_ids[name] = model_id or name
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under '{name}'")
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is None:
+                started = time.perf_counter()
+                model = self._loaders[name]()
+                self.load_seconds[name] = time.perf_counter() - started
+                self._models[name] = model
+        return model
+
+    def set(self, name, model, model_id=None):
+        """Installs an already-built backend (e.g. a stub) in place of the loader."""
+        with self._registry_lock:
+            self._locks.setdefault(name, threading.Lock())
+            self._model_ids[name] = model_id or f"{type(model).__module__}.{type(model).__name__}"
+        with self._locks[name]:
+            self._models[name] = model
+
+    def model_ids(self, names=None):
+        """Identifiers of the configured backends, e.g. for keying cached results."""
+        return [f"{n}={self._model_ids.get(n, n)}" for n in sorted(names or self._model_ids)]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def status(self):
+        """{name: loaded?} for every registered or installed model, for readiness checks."""
+        return {n: n in self._models for n in sorted(set(self._loaders) | set(self._models))}
+
+    def unload(self, name=None):
+        """Drops one (or every) loaded model so the next get() reloads it."""
+        names = [name] if name else list(self._models)
+        for n in names:
+            with self._locks[n]:
+                self._models.pop(n, None)
+                if n in self._loader_ids:
+                    self._model_ids[n] = self._loader_ids[n]
+
+    def warmup(self, names=None):
+        """Loads the given models (default: all registered) ahead of the first request."""
+        for name in names or list(self._loaders):
+            self.get(name)
+
+# --- Stub backends -------------------------------------------------------------------
+# Cheap stand-ins with the same call shape as spaCy / the transformers pipeline,
+# for unit tests, benchmarks and tools that must run without model downloads.
+
+class _StubEntity:
+    def __init__(self, text, label):
+        self.text = text
+        self.label_ = label
+
+class _StubDoc:
+    def __init__(self, text):
+        self.text = text
+        self.ents = tuple(_StubEntity(m.group(0), "ORG")
+                          for m in re.finditer(r"\b[A-Z][\w-]*(?: [A-Z][\w-]*)*", text))
+
+class StubNLP:
+    meta = {"lang": "en", "name": "stub", "version": "0"}
+
+    def __call__(self, text):
+        return _StubDoc(text)
+
+    def pipe(self, texts, batch_size=None, **kwargs):
+        for text in texts:
+            yield _StubDoc(text)
+
+class StubSummarizer:
+    def __call__(self, texts, max_length=32, min_length=10, **kwargs):
+        def summarize(text):
+            return {"summary_text": " ".join(text.split()[:max_length])}
+        if isinstance(texts, (list, tuple)):
+            return [summarize(t) for t in texts]
+        return [summarize(texts)]
+
+# --- Default registry ----------------------------------------------------------------
+
+def _load_spacy():
+    import spacy
+    return spacy.load(SPACY_MODEL)
+
+def _load_summarizer():
+    from cpu_inference import load_summarizer
+    return load_summarizer(SUMMARIZER_MODEL, INFERENCE_PROFILE)
+
+registry = ModelRegistry()
+registry.register("nlp", _load_spacy, model_id=f"spacy/{SPACY_MODEL}")
+registry.register("summarizer", _load_summarizer,
+                  model_id=f"transformers/{SUMMARIZER_MODEL}/{INFERENCE_PROFILE.model_id_suffix}")
+
+def use_stub_models():
+    registry.set("nlp", StubNLP(), model_id="stub/nlp")
+    registry.set("summarizer", StubSummarizer(), model_id="stub/summarizer")
+
+if os.environ.get("PERSONA_STUB_MODELS") == "1":
+    use_stub_models()
+
+def get_nlp():
+    return registry.get("nlp")
+
+def get_summarizer():
+    return registry.get("summarizer")
+
+def warmup():
+    registry.warmup()
+
+def preload_for_fork():
+    """
+    Loads every model in a parent process that is about to fork workers, so the weights
+    are shared copy-on-write instead of loaded once per worker.
+
+    The summarizer is loaded with a single torch thread, since an OpenMP pool started
+    before fork() is unusable in the children; each worker sizes its own pool afterwards
+    (cpu_inference.configure_worker_threads). gc.freeze() then moves everything loaded so
+    far out of the collector's reach, so GC passes in the workers don't write to, and
+    thereby copy, the shared pages.
+    """
+    worker_threads = INFERENCE_PROFILE.intra_threads
+    INFERENCE_PROFILE.intra_threads = 1
+    try:
+        warmup()
+    finally:
+        INFERENCE_PROFILE.intra_threads = worker_threads
+    gc.freeze()
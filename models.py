@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -10,11 +11,77 @@ class Journalist(Base):
     interests = Column(Text, nullable=False)
     style = Column(Text, nullable=False)
     sample_articles = Column(Text, nullable=True)
+    external_id = Column(String(128), nullable=True)  # natural key from media-list imports
+
+    __table_args__ = (
+        Index('ux_journalists_external_id', 'external_id', unique=True),
+    )
+
+class Pitch(Base):
+    """
+    Each distinct pitch text, stored once and referenced by every Interaction it produced,
+    with the journalist-independent analysis (JSON topics/entities, summary) computed for it.
+    """
+    __tablename__ = 'pitches'
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False, unique=True)  # sha256 of the exact text
+    text = Column(Text, nullable=False)
+    topics = Column(Text, nullable=True)
+    entities = Column(Text, nullable=True)
+    summary = Column(Text, nullable=True)
+    analysis_model = Column(String(255), nullable=True)  # model IDs that produced the analysis
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
 class Interaction(Base):
     __tablename__ = 'interactions'
     id = Column(Integer, primary_key=True)
     journalist_id = Column(Integer, ForeignKey('journalists.id'))
-    pitch = Column(Text)
+    pitch = Column(Text)  # legacy inline copy; new rows store the text once in pitches (pitch_id)
+    pitch_id = Column(Integer, ForeignKey('pitches.id'), nullable=True, index=True)
     response = Column(Text)
-    journalist = relationship("Journalist")
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # NULL for rows written before this column existed
+    conversation_id = Column(Integer, ForeignKey('conversations.id'), nullable=True)  # NULL for one-off pitches
+    turn = Column(Integer, nullable=True)
+    campaign_key = Column(String(64), nullable=True)  # sha256 of (campaign, pitch, journalist); NULL outside campaigns
+    journalist = relationship("Journalist")
+    stored_pitch = relationship("Pitch")
+
+    @property
+    def pitch_text(self):
+        return self.stored_pitch.text if self.pitch_id is not None else self.pitch
+
+    __table_args__ = (
+        Index('ix_interactions_journalist_id_created_at', 'journalist_id', 'created_at'),
+        Index('ix_interactions_conversation_id_id', 'conversation_id', 'id'),
+        Index('ix_interactions_journalist_id_id', 'journalist_id', 'id'),  # per-journalist keyset pages
+        Index('ux_interactions_campaign_key', 'campaign_key', unique=True),
+    )
+
+class Conversation(Base):
+    """
+    A multi-turn exchange with one journalist. `context` holds the rolling window of the
+    last few turns' analyses (JSON), so a new turn reads one row instead of the history.
+    """
+    __tablename__ = 'conversations'
+    id = Column(Integer, primary_key=True)
+    journalist_id = Column(Integer, ForeignKey('journalists.id'), nullable=False, index=True)
+    turn_count = Column(Integer, nullable=False, default=0)
+    context = Column(Text, nullable=False, default='[]')
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    journalist = relationship("Journalist")
+
+class PersonaJob(Base):
+    """A queued /query_persona request, processed out of band by job_queue workers."""
+    __tablename__ = 'persona_jobs'
+    id = Column(String(32), primary_key=True)
+    status = Column(String(16), nullable=False, default='queued', index=True)
+    pitch = Column(Text, nullable=False)
+    journalist_ids = Column(Text, nullable=False)  # JSON list
+    result = Column(Text, nullable=True)  # JSON list of {'name', 'response'}
+    error = Column(Text, nullable=True)
+    worker = Column(String(64), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,102 @@
+"""
+Rendered-page cache for the documentation routes (/arch, /plan, /persona).
+
+A page is rendered once and kept as both the plain body and a gzip-compressed copy.
+Its version is the (path, mtime, size) of every file it is built from, re-checked with
+a stat pass at most every `check_interval` seconds; any change re-renders it. Responses
+carry ETag and Last-Modified, conditional requests get 304 Not Modified, and clients
+that accept gzip get the precompressed body.
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import Response
+
+class CachedPage:
+    __slots__ = ("version", "body", "gzip_body", "etag", "last_modified")
+
+    def __init__(self, version, body, last_modified):
+        self.version = version
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.last_modified = last_modified
+
+def _stat_files(paths):
+    """(path, mtime_ns, size) for each file, and each file directly inside each directory."""
+    stats = []
+    for path in paths:
+        if os.path.isdir(path):
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        st = entry.stat()
+                        stats.append((entry.path, st.st_mtime_ns, st.st_size))
+        elif os.path.exists(path):
+            st = os.stat(path)
+            stats.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(sorted(stats))
+
+class PageCache:
+    def __init__(self, check_interval=1.0, max_age=0):
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self.stats = {"renders": 0, "hits": 0, "not_modified": 0}
+        self._pages = {}     # key -> CachedPage
+        self._checked = {}   # key -> (monotonic time, version)
+        self._lock = threading.Lock()
+
+    def _version(self, key, sources):
+        now = time.monotonic()
+        checked = self._checked.get(key)
+        if checked is not None and now - checked[0] < self.check_interval:
+            return checked[1]
+        version = _stat_files(sources)
+        self._checked[key] = (now, version)
+        return version
+
+    def page(self, key, sources, render):
+        """The cached page for `key`, re-rendered with render() -> str when `sources` changed."""
+        version = self._version(key, sources)
+        page = self._pages.get(key)
+        if page is not None and page.version == version:
+            self.stats["hits"] += 1
+            return page
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None or page.version != version:
+                newest = max((mtime for _, mtime, _ in version), default=time.time_ns())
+                last_modified = datetime.fromtimestamp(newest // 10 ** 9, tz=timezone.utc)
+                page = CachedPage(version, render().encode("utf-8"), last_modified)
+                self._pages[key] = page
+                self.stats["renders"] += 1
+        return page
+
+    def respond(self, request, key, sources, render, mimetype="text/html"):
+        """A 200 (gzip when accepted) or 304 Response for the cached page."""
+        page = self.page(key, sources, render)
+        use_gzip = "gzip" in request.accept_encodings
+        # Each encoding is its own representation, so it gets its own validator
+        etag = f"{page.etag}-gz" if use_gzip else page.etag
+
+        if request.if_none_match:
+            fresh = request.if_none_match.contains(etag)
+        else:
+            fresh = request.if_modified_since is not None and page.last_modified <= request.if_modified_since
+        if fresh:
+            self.stats["not_modified"] += 1
+            response = Response(status=304)
+        else:
+            response = Response(page.gzip_body if use_gzip else page.body, mimetype=mimetype)
+            if use_gzip:
+                response.headers["Content-Encoding"] = "gzip"
+        response.set_etag(etag)
+        response.last_modified = page.last_modified
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        response.vary.add("Accept-Encoding")
+        return response
@@ -0,0 +1,196 @@
+"""
+In-memory registry of persona documents with a compiled snapshot on disk.
+
+Each *.json file in the persona directory is read, parsed and validated once, then
+served from memory. refresh() re-stats the directory at most every `check_interval`
+seconds: files whose (mtime, size) changed are re-read, and only re-parsed if their
+sha256 changed too. The parsed documents are written to a marshal snapshot, so the
+next process start loads one binary file instead of parsing every JSON document; the
+snapshot is tied to the Python version and ignored (and rebuilt) on mismatch.
+
+`factory` turns a validated document into the object get() returns. PersonaBank.from_paths
+and from_directory (alt/persona_bank.py) keep one registry per directory with
+factory=Persona.from_data, so each document is parsed once per process.
+"""
+import hashlib
+import json
+import logging
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+REQUIRED_PATHS = (
+    ("persona_identification", "persona_name"),
+    ("persona_identification", "real_person_reference", "real_person_full_name"),
+)
+
+def validate(data):
+    """Problems that keep a document from being used as a Persona; [] if none."""
+    if not isinstance(data, dict):
+        return ["document is not a JSON object"]
+    problems = []
+    for path in REQUIRED_PATHS:
+        node = data
+        for key in path:
+            node = node.get(key) if isinstance(node, dict) else None
+        if not node:
+            problems.append(f"missing {'.'.join(path)}")
+    return problems
+
+class PersonaDocument:
+    __slots__ = ("name", "path", "mtime_ns", "size", "sha256", "text", "data", "errors")
+
+    def __init__(self, name, path, mtime_ns, size, sha256, text, data, errors):
+        self.name = name
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.sha256 = sha256
+        self.text = text
+        self.data = data
+        self.errors = errors
+
+    @property
+    def valid(self):
+        return not self.errors
+
+    def to_record(self):
+        return (self.name, self.path, self.mtime_ns, self.size, self.sha256, self.text, self.data, self.errors)
+
+    @classmethod
+    def read(cls, name, path, stat):
+        with open(path, "rb") as f:
+            raw = f.read()
+        text = raw.decode("utf-8")
+        try:
+            data = json.loads(text)
+            errors = validate(data)
+        except json.JSONDecodeError as e:
+            data, errors = None, [f"invalid JSON: {e}"]
+        return cls(name, path, stat.st_mtime_ns, stat.st_size, hashlib.sha256(raw).hexdigest(), text, data, errors)
+
+class PersonaRegistry:
+    def __init__(self, directory, snapshot_path=None, factory=None, check_interval=1.0):
+        self.directory = directory
+        self.snapshot_path = snapshot_path
+        self.factory = factory
+        self.check_interval = check_interval
+        self.stats = {"refreshes": 0, "parsed": 0, "snapshot_loads": 0}
+        self._documents = {}  # name -> PersonaDocument
+        self._built = {}      # name -> (sha256, factory(data))
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._load_snapshot()
+
+    # --- Snapshot --------------------------------------------------------------------
+
+    def _snapshot_header(self):
+        return (SNAPSHOT_FORMAT, tuple(sys.version_info[:2]), os.path.abspath(self.directory))
+
+    def _load_snapshot(self):
+        if not self.snapshot_path:
+            return
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                header, records = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return
+        if tuple(header) != self._snapshot_header():
+            return
+        self._documents = {r[0]: PersonaDocument(*r) for r in records}
+        self.stats["snapshot_loads"] += 1
+
+    def _save_snapshot(self):
+        """Writes the snapshot; a failed write is logged, never raised (the snapshot is only a cache)."""
+        if not self.snapshot_path:
+            return
+        records = [doc.to_record() for doc in self._documents.values()]
+        directory, name = os.path.split(os.path.abspath(self.snapshot_path))
+        tmp = None
+        try:
+            # A unique temp file + rename, so processes saving at once never share a file and
+            # one starting concurrently never reads half a snapshot
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{name}.")
+            with os.fdopen(fd, "wb") as f:
+                marshal.dump((self._snapshot_header(), records), f)
+            os.replace(tmp, self.snapshot_path)
+            tmp = None
+        except (OSError, ValueError) as e:
+            logger.warning("Could not write persona snapshot %s: %s", self.snapshot_path, e)
+        finally:
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+    # --- Reloading -------------------------------------------------------------------
+
+    def refresh(self, force=False):
+        """Picks up added, changed and removed documents. Returns True if anything changed."""
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            if not force and self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return False
+            self.stats["refreshes"] += 1
+            documents, changed = {}, False
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".json") or not entry.is_file():
+                        continue
+                    name = entry.name[:-5]
+                    stat = entry.stat()
+                    doc = self._documents.get(name)
+                    if doc is None or (doc.mtime_ns, doc.size) != (stat.st_mtime_ns, stat.st_size):
+                        fresh = PersonaDocument.read(name, entry.path, stat)
+                        if doc is None or fresh.sha256 != doc.sha256:
+                            self.stats["parsed"] += 1
+                            doc = fresh
+                        else:
+                            doc.mtime_ns, doc.size = fresh.mtime_ns, fresh.size  # touched, not edited
+                        changed = True
+                    documents[name] = doc
+            if documents.keys() != self._documents.keys():
+                changed = True
+            self._documents = documents
+            self._built = {n: b for n, b in self._built.items()
+                           if n in documents and documents[n].sha256 == b[0]}
+            if changed:
+                self._save_snapshot()
+            self._checked_at = time.monotonic()
+            return changed
+
+    # --- Lookup ----------------------------------------------------------------------
+
+    def documents(self):
+        """Every document (valid or not), sorted by name."""
+        self.refresh()
+        return [self._documents[n] for n in sorted(self._documents)]
+
+    def names(self):
+        return [doc.name for doc in self.documents() if doc.valid]
+
+    def get(self, name):
+        """The factory-built object for a valid document (the parsed dict without a factory)."""
+        self.refresh()
+        doc = self._documents.get(name)
+        if doc is None:
+            raise KeyError(f"No persona document named '{name}'")
+        if not doc.valid:
+            raise ValueError(f"Persona document '{name}' is invalid: {'; '.join(doc.errors)}")
+        built = self._built.get(name)
+        if built is None or built[0] != doc.sha256:
+            built = (doc.sha256, self.factory(doc.data) if self.factory else doc.data)
+            self._built[name] = built
+        return built[1]
+
+    def personas(self):
+        return [self.get(name) for name in self.names()]
@@ -1,27 +1,29 @@
-from models import Base, Journalist
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from journalist_import import import_journalists
+from storage import make_engine, migrate
 
-engine = create_engine('sqlite:///pr_platform.db')
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-session = Session()
+engine = make_engine()
+migrate(engine)
 
-# Seed: three PR journalist personas
+# Seed: three PR journalist personas. Upserted by external_id, so re-running the seed
+# refreshes them in place and keeps their IDs (and Interaction history); rows seeded
+# before external_id existed are adopted by name.
 personas = [
-    Journalist(
+    dict(
+        external_id="seed-alice-smith",
         name="Alice Smith",
         interests="tech, startups, AI",
         style="inquisitive, neutral",
         sample_articles="The Rise of AI Startups; How Technology is Shaping the Future"
     ),
-    Journalist(
+    dict(
+        external_id="seed-bob-johnson",
         name="Bob Johnson",
         interests="consumer electronics, gadgets, innovation",
         style="formal, analytical",
         sample_articles="The Next Big Thing in Consumer Electronics; In-Depth: Gadget Trends 2025"
     ),
-    Journalist(
+    dict(
+        external_id="seed-carol-lee",
         name="Carol Lee",
         interests="marketing, branding, social media",
         style="conversational, engaging",
@@ -29,7 +31,5 @@ personas = [
     ),
 ]
 
-session.query(Journalist).delete()  # Clear old data for clean seed
-session.add_all(personas)
-session.commit()
-print("Database seeded with journalist personas.")
\ No newline at end of file
+import_journalists(engine, personas, adopt_by_name=True)
+print("Database seeded with journalist personas.")
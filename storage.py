@@ -0,0 +1,343 @@
+"""
+Database engine setup, schema migration and the buffered Interaction write path.
+
+Every process (web workers, job_queue workers, scripts) should build its engine with
+make_engine() so SQLite runs in WAL mode with a busy timeout; that is what lets several
+gunicorn workers write to pr_platform.db without "database is locked" errors.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime
+
+from sqlalchemy import bindparam, create_engine, event, inspect, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+import metrics
+from models import Base, Interaction, Pitch
+
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = os.environ.get('PERSONA_DATABASE_URL', 'sqlite:///pr_platform.db')
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',       # readers don't block the writer and vice versa
+    'synchronous': 'NORMAL',     # durable across app crashes; fsync only at checkpoints in WAL mode
+    'busy_timeout': 30000,       # ms to wait on a locked database instead of failing at once
+    'foreign_keys': 'ON',
+    'temp_store': 'MEMORY',
+    'cache_size': -64000,        # 64 MB page cache per connection
+}
+
+# Engines and writers created in this process, so they can be reset in forked children
+_engines = weakref.WeakSet()
+_writers = weakref.WeakSet()
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+def make_engine(url=None, pool_size=None, max_overflow=None, pool_timeout=None,
+                pool_recycle=None, echo=False):
+    """
+    Creates an engine with the SQLite pragmas applied on every new connection.
+    Pool settings default to PERSONA_DB_POOL_SIZE / _MAX_OVERFLOW / _POOL_TIMEOUT /
+    _POOL_RECYCLE and are ignored for in-memory SQLite, which has no pool to size.
+    """
+    url = url or DATABASE_URL
+    is_sqlite = url.startswith('sqlite')
+    kwargs = {'future': True, 'echo': echo, 'pool_pre_ping': not is_sqlite}
+    if is_sqlite:
+        kwargs['connect_args'] = {'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+                                  'check_same_thread': False}
+    if ':memory:' not in url and url not in ('sqlite://', 'sqlite:///'):
+        kwargs['pool_size'] = pool_size or _env_int('PERSONA_DB_POOL_SIZE', 10)
+        kwargs['max_overflow'] = max_overflow if max_overflow is not None else _env_int('PERSONA_DB_MAX_OVERFLOW', 20)
+        kwargs['pool_timeout'] = pool_timeout or _env_int('PERSONA_DB_POOL_TIMEOUT', 30)
+        kwargs['pool_recycle'] = pool_recycle or _env_int('PERSONA_DB_POOL_RECYCLE', 3600)
+    engine = create_engine(url, **kwargs)
+
+    if is_sqlite:
+        @event.listens_for(engine, 'connect')
+        def _set_sqlite_pragmas(dbapi_conn, _record):
+            cur = dbapi_conn.cursor()
+            for name, value in SQLITE_PRAGMAS.items():
+                cur.execute(f"PRAGMA {name}={value}")
+            cur.close()
+    _engines.add(engine)
+    return engine
+
+# --- Migrations ----------------------------------------------------------------------
+
+# Columns added after the first release: table -> [(column, DDL type)]
+ADDED_COLUMNS = {
+    'journalists': [('external_id', 'VARCHAR(128)')],
+    'interactions': [('created_at', 'DATETIME'), ('conversation_id', 'INTEGER REFERENCES conversations(id)'),
+                     ('turn', 'INTEGER'), ('pitch_id', 'INTEGER REFERENCES pitches(id)'),
+                     ('campaign_key', 'VARCHAR(64)')],
+}
+
+def migrate(engine):
+    """
+    Brings an existing database up to the current models: creates missing tables,
+    adds columns introduced since the database was created, then creates any missing
+    indexes. Safe to run on every start.
+    """
+    Base.metadata.create_all(engine)
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {c['name'] for c in insp.get_columns(table)}
+            for name, ddl in columns:
+                if name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def backfill_pitches(engine, chunk_size=5000):
+    """
+    Moves inline Interaction.pitch copies into the pitches table, one transaction per
+    chunk, and returns the number of rows moved. Run once after migrating an older
+    database (python storage.py backfill); rows not yet moved still read their inline
+    pitch. Run VACUUM afterwards (python storage.py
+    vacuum) to hand the freed pages back to the filesystem.
+    """
+    moved = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(Interaction.id, Interaction.pitch)
+                .where(Interaction.pitch_id.is_(None), Interaction.pitch.is_not(None))
+                .order_by(Interaction.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                return moved
+            ids = pitch_ids(conn, {pitch for _, pitch in rows})
+            conn.execute(
+                update(Interaction).where(Interaction.id == bindparam('b_id'))
+                .values(pitch_id=bindparam('b_pitch_id'), pitch=None)
+                .execution_options(synchronize_session=False),
+                [{'b_id': iid, 'b_pitch_id': ids[pitch]} for iid, pitch in rows],
+            )
+        moved += len(rows)
+
+# --- Deduplicated pitches ------------------------------------------------------------
+
+def pitch_hash(pitch_text):
+    return hashlib.sha256(pitch_text.encode('utf-8')).hexdigest()
+
+def pitch_ids(conn, pitch_texts, analyses=None):
+    """
+    Returns {text: pitches.id} for the given pitch texts, inserting the ones not stored
+    yet. `analyses` maps text -> {'topics', 'entities', 'summary', 'model'}; it is stored
+    with new pitches and fills in stored pitches that have no analysis yet.
+    """
+    analyses = analyses or {}
+    by_hash = {pitch_hash(t): t for t in pitch_texts}
+    if not by_hash:
+        return {}
+    known = dict(conn.execute(
+        select(Pitch.content_hash, Pitch.id).where(Pitch.content_hash.in_(list(by_hash)))).all())
+    missing = [h for h in by_hash if h not in known]
+    if missing:
+        now = datetime.utcnow()
+        rows = [dict(content_hash=h, text=by_hash[h], created_at=now,
+                     **_analysis_columns(analyses.get(by_hash[h]))) for h in missing]
+        dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(conn.dialect.name)
+        if dialect is not None:
+            # Another process may store the same pitch concurrently; the unique hash settles it
+            conn.execute(dialect.insert(Pitch).on_conflict_do_nothing(index_elements=['content_hash']), rows)
+        else:
+            conn.execute(insert(Pitch), rows)
+        known.update(conn.execute(
+            select(Pitch.content_hash, Pitch.id).where(Pitch.content_hash.in_(missing))).all())
+    stale = [dict(_analysis_columns(analyses[t]), b_hash=h)
+             for h, t in by_hash.items() if h not in missing and analyses.get(t)]
+    if stale:
+        conn.execute(
+            update(Pitch).where(Pitch.content_hash == bindparam('b_hash'), Pitch.summary.is_(None))
+            .values({c: bindparam(c) for c in ('topics', 'entities', 'summary', 'analysis_model')})
+            .execution_options(synchronize_session=False),
+            stale,
+        )
+    return {by_hash[h]: pid for h, pid in known.items()}
+
+def _analysis_columns(analysis):
+    if not analysis:
+        return dict(topics=None, entities=None, summary=None, analysis_model=None)
+    return dict(topics=json.dumps(analysis['topics']), entities=json.dumps(analysis['entities']),
+                summary=analysis['summary'], analysis_model=analysis.get('model'))
+
+# --- Buffered interaction writes -----------------------------------------------------
+
+class InteractionWriter:
+    """
+    Buffers Interaction rows and writes them with one executemany INSERT per flush.
+
+    Rows are flushed when `max_batch` are pending or `max_delay` seconds after the first
+    pending row, by a background thread, and at interpreter exit. With max_delay=0 every
+    add() writes synchronously.
+
+    Writes never raise into the caller. A failed batch is put back and retried with the
+    next flush; after `max_retries` consecutive failures the pending rows are written one
+    by one and the rows that still fail (e.g. a foreign key violation) are logged and
+    dropped, so one bad row cannot hold up every later interaction.
+    """
+    def __init__(self, engine, max_batch=500, max_delay=0.5, max_retries=3):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.stats = {'rows': 0, 'flushes': 0, 'errors': 0, 'dropped': 0}
+        self._failures = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = None
+        self._start_thread()
+        _writers.add(self)
+        atexit.register(self.close)
+
+    def _start_thread(self):
+        if self.max_delay > 0:
+            self._thread = threading.Thread(target=self._run, name='interaction-writer', daemon=True)
+            self._thread.start()
+
+    def _reset_after_fork(self):
+        # The flush thread does not survive fork and the parent still owns its pending rows
+        self._pending = []
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        if not self._closed:
+            self._start_thread()
+
+    def add(self, journalist_id, pitch, response, analysis=None, **extra):
+        """
+        Queues one row. The pitch text is stored once in the pitches table at flush time;
+        `analysis` (ai_persona.analysis_record) is kept with it.
+        """
+        row = dict(journalist_id=journalist_id, pitch=pitch, response=response,
+                   created_at=datetime.utcnow(), analysis=analysis, **extra)
+        with self._lock:
+            self._pending.append(row)
+            full = len(self._pending) >= self.max_batch
+        if full or self._thread is None:
+            self.flush()
+        else:
+            self._wakeup.set()
+
+    def pending(self):
+        """Number of rows buffered and not yet written."""
+        with self._lock:
+            return len(self._pending)
+
+    def _write(self, rows):
+        with metrics.stage('db_commit'):
+            with self.engine.begin() as conn:
+                analyses = {r['pitch']: r['analysis'] for r in rows if r['analysis']}
+                ids = pitch_ids(conn, {r['pitch'] for r in rows}, analyses)
+                conn.execute(insert(Interaction), [
+                    dict({k: v for k, v in r.items() if k != 'analysis'},
+                         pitch=None, pitch_id=ids[r['pitch']])
+                    for r in rows
+                ])
+
+    def flush(self):
+        """Writes the pending rows and returns how many were written. Never raises."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            try:
+                self._write(rows)
+                written = len(rows)
+            except Exception as e:
+                metrics.ERRORS.inc('db_commit')
+                self.stats['errors'] += 1
+                self._failures += 1
+                if self._failures < self.max_retries:
+                    logger.warning("Failed to write %d interactions (attempt %d of %d): %s",
+                                   len(rows), self._failures, self.max_retries, e)
+                    with self._lock:
+                        self._pending[:0] = rows  # keep them for the next flush
+                    return 0
+                logger.error("Failed to write %d interactions %d times, retrying row by row: %s",
+                             len(rows), self._failures, e)
+                written = self._write_each(rows)
+            self._failures = 0
+            self.stats['rows'] += written
+            self.stats['flushes'] += 1
+            return written
+
+    def _write_each(self, rows):
+        written = 0
+        for row in rows:
+            try:
+                self._write([row])
+                written += 1
+            except Exception as e:
+                metrics.ERRORS.inc('db_commit_dropped')
+                self.stats['dropped'] += 1
+                logger.error("Dropping interaction for journalist %s: %s", row.get('journalist_id'), e)
+        return written
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            time.sleep(self.max_delay)
+            self.flush()
+            if self.pending():
+                self._wakeup.set()  # a failed batch was put back; retry after the next delay
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        for _ in range(self.max_retries):
+            self.flush()
+            if not self.pending():
+                break
+
+def _after_fork_in_child():
+    # Pooled connections must never be shared across processes (SQLAlchemy "Using
+    # Connection Pools with Multiprocessing"): drop the parent's without closing them.
+    for engine in list(_engines):
+        engine.dispose(close=False)
+    for writer in list(_writers):
+        writer._reset_after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        target = sys.argv[2] if len(sys.argv) > 2 else DATABASE_URL
+        migrate(make_engine(target))
+        print(f"Migrated {target}")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'backfill':
+        target = sys.argv[2] if len(sys.argv) > 2 else DATABASE_URL
+        print(f"Moved {backfill_pitches(make_engine(target))} inline pitches in {target}")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'vacuum':
+        target = sys.argv[2] if len(sys.argv) > 2 else DATABASE_URL
+        with make_engine(target).connect() as conn:
+            conn.execution_options(isolation_level='AUTOCOMMIT').execute(text('VACUUM'))
+        print(f"Vacuumed {target}")
+    else:
+        print("usage: python storage.py migrate|backfill|vacuum [DATABASE_URL]")
@@ -0,0 +1,29 @@
+"""
+Production WSGI entry point:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app (see gunicorn.conf.py) this module is imported once in the gunicorn
+master. The models are loaded here, before the workers are forked, so every worker maps
+the same weights copy-on-write. PERSONA_PRELOAD_MODELS=0 keeps lazy per-worker loading.
+"""
+import os
+
+import model_registry
+
+if os.environ.get("PERSONA_PRELOAD_MODELS", "1") == "1":
+    model_registry.preload_for_fork()
+
+from app import app  # noqa: E402
+
+def warmup_worker():
+    """
+    Runs one pitch end to end in a freshly forked worker, so the first real request
+    doesn't pay for thread pool start-up and first-call allocations. Raises if the
+    models can't produce an analysis, which keeps a broken worker from booting.
+    """
+    from ai_persona import analyze_pitch
+
+    analysis = analyze_pitch("Acme Corp launches a new battery for electric delivery vans.", use_cache=False)
+    if not analysis.summary:
+        raise RuntimeError("warm-up pitch produced an empty summary")